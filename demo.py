@@ -13,6 +13,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'registration_system.settings')
 django.setup()
 
 from registrations.models import Registration, TeamMember
+from registrations.purge import purge_registrations
 
 def create_sample_data():
     """إنشاء بيانات تجريبية"""
@@ -67,12 +68,12 @@ def create_sample_data():
             
             # إنشاء أعضاء الفريق
             for member_data in data['members']:
-                member = TeamMember.objects.create(
+                TeamMember.objects.create(
+                    registration=registration,
                     name=member_data['name'],
                     level=member_data['level'],
                     order=member_data['order']
                 )
-                registration.members.add(member)
             
             created_count += 1
             print(f"✅ تم إنشاء تسجيل للفريق: {data['team_leader_email']}")
@@ -99,7 +100,7 @@ def display_statistics():
     
     for reg in registrations:
         members_list = []
-        for member in reg.members.all().order_by('order'):
+        for member in reg.members.all():
             members_list.append(f"{member.name} ({member.get_level_display()})")
         
         print(f"\n📋 فريق: {reg.team_leader_email}")
@@ -123,11 +124,10 @@ def clear_sample_data():
     """مسح البيانات التجريبية"""
     print("\n🗑️ مسح جميع البيانات...")
     
-    # حذف جميع التسجيلات والأعضاء
-    Registration.objects.all().delete()
-    TeamMember.objects.all().delete()
+    # حذف جميع التسجيلات والأعضاء دون تحميلها في الذاكرة
+    registrations, members = purge_registrations()
     
-    print("✅ تم مسح جميع البيانات")
+    print(f"✅ تم مسح جميع البيانات ({registrations} تسجيل، {members} عضو)")
 
 def main():
     """الدالة الرئيسية"""
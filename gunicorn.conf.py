@@ -0,0 +1,27 @@
+"""
+Gunicorn settings, read automatically from the working directory.
+
+Each worker warms up (URL resolver, templates, database connection, cached
+reads) after loading the application and before accepting connections, so
+the first request after a scale-from-zero does not pay for it.
+
+While change-feed long-polling is enabled (EVENTS_MAX_WAIT > 0) workers are
+threaded: a long-poll sleeps inside its request for up to EVENTS_MAX_WAIT
+seconds, and with gunicorn's default single sync worker one polling
+consumer would keep the registration form waiting behind it.
+"""
+
+import os
+
+if int(os.environ.get('EVENTS_MAX_WAIT', '20')) > 0:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    if settings.WARMUP_ENABLED:
+        from registrations.warmup import warm_up
+
+        warm_up()
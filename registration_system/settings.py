@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -49,7 +50,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'registrations.slow_queries.SlowQueryMiddleware',  # Logs SQL slower than SLOW_QUERY_THRESHOLD_MS
     'django.middleware.security.SecurityMiddleware',
+    'registrations.compression.CompressionMiddleware',  # Brotli/gzip per COMPRESSION_LEVELS
+    'registrations.routers.ReplicaRoutingMiddleware',  # Request reads go to DATABASE_REPLICAS
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'registrations.profiling.ProfilingMiddleware',  # Opt-in per-request profiler; keep last
 ]
 
 # Security settings for production
@@ -138,6 +143,91 @@ else:
         }
     }
 
+# Read replicas: comma-separated database URLs, one per replica, added as
+# aliases replica1, replica2, ... ReplicaRouter sends request reads to them
+# (see registrations/routers.py). postgres:// replicas mirror the primary in
+# tests; sqlite:////path/to/file.sqlite3 is for local experiments.
+DATABASE_REPLICAS = []
+REPLICA_DATABASE_URLS = [url.strip() for url in get_env_variable('REPLICA_DATABASE_URLS', '').split(',') if url.strip()]
+
+# The test runner gets one unreplicated SQLite replica instead, so the routing
+# tests can tell which database served a read. It stays out of
+# DATABASE_REPLICAS; ReplicaRoutingTests routes to it with override_settings.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+if TESTING:
+    REPLICA_DATABASE_URLS = []
+    DATABASES['replica1'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica1.sqlite3',
+    }
+
+for index, replica_url in enumerate(REPLICA_DATABASE_URLS, start=1):
+    parsed_replica = urlparse(replica_url)
+    alias = f'replica{index}'
+    if parsed_replica.scheme == 'sqlite':
+        DATABASES[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': parsed_replica.path[1:],
+        }
+    else:
+        DATABASES[alias] = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': parsed_replica.path[1:],
+            'USER': parsed_replica.username,
+            'PASSWORD': parsed_replica.password,
+            'HOST': parsed_replica.hostname,
+            'PORT': parsed_replica.port or 5432,
+            'TEST': {'MIRROR': 'default'},
+        }
+    DATABASE_REPLICAS.append(alias)
+
+# Connections stay open between requests for DB_CONN_MAX_AGE seconds, so the
+# connection a worker opens while warming up (see registrations/warmup.py) is
+# the one its first request uses; health checks replace connections the
+# server dropped while the service was idle
+DB_CONN_MAX_AGE = int(get_env_variable('DB_CONN_MAX_AGE', '60'))
+for database in DATABASES.values():
+    database.setdefault('CONN_MAX_AGE', DB_CONN_MAX_AGE)
+    database.setdefault('CONN_HEALTH_CHECKS', True)
+
+DATABASE_ROUTERS = ['registrations.routers.ReplicaRouter']
+
+# After a request writes, the client reads from the primary for this many
+# seconds so it sees its own changes despite replication lag
+REPLICA_PIN_SECONDS = int(get_env_variable('REPLICA_PIN_SECONDS', '15'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# CACHE_URL picks the backend: unset for local memory (per worker),
+# file:///path/to/dir to share between workers on one machine, or
+# redis://host:port/db to share across machines (needs the redis package)
+CACHE_URL = get_env_variable('CACHE_URL', '')
+parsed_cache_url = urlparse(CACHE_URL)
+
+if parsed_cache_url.scheme in ('redis', 'rediss'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif parsed_cache_url.scheme == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': parsed_cache_url.path,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'registrations',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -190,6 +280,133 @@ else:
 # WhiteNoise settings
 WHITENOISE_USE_FINDERS = True
 
+# Seconds a browser may reuse a live email-availability answer; the lookup
+# behind it is cached server-side and invalidated on every registration
+EMAIL_CHECK_MAX_AGE = int(get_env_variable('EMAIL_CHECK_MAX_AGE', '10'))
+
+# Response compression: content types to compress and the Brotli quality
+# (0-11) and gzip level (1-9) for each. Brotli is used when the client accepts
+# it and the brotli package is installed. Bodies shorter than
+# COMPRESSION_MIN_LENGTH bytes are sent as is.
+COMPRESSION_LEVELS = {
+    'text/html': {'br': 5, 'gzip': 6},
+    'application/json': {'br': 5, 'gzip': 6},
+    'text/plain': {'br': 5, 'gzip': 6},
+    # Exports are large; favour speed over ratio
+    'text/csv': {'br': 3, 'gzip': 4},
+}
+COMPRESSION_MIN_LENGTH = int(get_env_variable('COMPRESSION_MIN_LENGTH', '500'))
+
+# Competition edition that new registrations belong to. Earlier seasons can
+# be moved out of the live tables with the archive_season command. Required
+# and set by hand when a new edition opens: following the calendar would
+# switch seasons on 1 January in the middle of a campaign, letting leaders
+# register twice and splitting quotas and the duplicates report.
+CURRENT_SEASON = int(get_env_variable('CURRENT_SEASON', '2026' if TESTING else None))
+
+# Paginated listings on PostgreSQL show planner estimates instead of running
+# COUNT(*) once a table or filtered result is estimated above this many rows
+APPROXIMATE_COUNT_THRESHOLD = int(get_env_variable('APPROXIMATE_COUNT_THRESHOLD', '10000'))
+
+# Background CSV exports are written here and kept this many hours
+EXPORT_SPOOL_DIR = get_env_variable('EXPORT_SPOOL_DIR', str(BASE_DIR / 'exports'))
+EXPORT_JOB_RETENTION_HOURS = int(get_env_variable('EXPORT_JOB_RETENTION_HOURS', '24'))
+
+# Email. Confirmations are queued in the outbox with the registration and
+# delivered by the send_outbox command; a failed email is retried after
+# OUTBOX_RETRY_BASE_SECONDS, doubling up to OUTBOX_RETRY_MAX_SECONDS, and
+# marked failed after OUTBOX_MAX_ATTEMPTS tries.
+EMAIL_BACKEND = get_env_variable('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = get_env_variable('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(get_env_variable('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = get_env_variable('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = get_env_variable('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = get_env_variable('EMAIL_USE_TLS', 'False').lower() == 'true'
+EMAIL_TIMEOUT = int(get_env_variable('EMAIL_TIMEOUT', '30'))
+DEFAULT_FROM_EMAIL = get_env_variable('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+OUTBOX_MAX_ATTEMPTS = int(get_env_variable('OUTBOX_MAX_ATTEMPTS', '8'))
+OUTBOX_RETRY_BASE_SECONDS = int(get_env_variable('OUTBOX_RETRY_BASE_SECONDS', '60'))
+OUTBOX_RETRY_MAX_SECONDS = int(get_env_variable('OUTBOX_RETRY_MAX_SECONDS', '21600'))
+
+# Change feed at /registration/events/. Downstream systems authenticate with
+# "Authorization: Bearer <EVENTS_API_TOKEN>" (staff sessions always may read
+# it). A long-poll holds a worker thread for up to EVENTS_MAX_WAIT seconds;
+# gunicorn.conf.py runs GUNICORN_THREADS threads per worker while it is above
+# 0, so polling consumers cannot starve the registration form.
+EVENTS_API_TOKEN = get_env_variable('EVENTS_API_TOKEN', '')
+EVENTS_MAX_WAIT = int(get_env_variable('EVENTS_MAX_WAIT', '20'))
+
+# Opt-in request profiler: reports go to PROFILER_DIR, the newest PROFILER_KEEP
+# are kept, and signed X-Profile-Token headers are valid for PROFILER_TOKEN_MAX_AGE seconds
+PROFILER_DIR = get_env_variable('PROFILER_DIR', str(BASE_DIR / 'profiles'))
+PROFILER_KEEP = int(get_env_variable('PROFILER_KEEP', '100'))
+PROFILER_TOKEN_MAX_AGE = int(get_env_variable('PROFILER_TOKEN_MAX_AGE', '3600'))
+
+# Gunicorn workers prime URLs, templates, database connections and cached
+# reads before taking traffic (gunicorn.conf.py); report the import-time side
+# of a cold start with: python manage.py startup_profile
+WARMUP_ENABLED = get_env_variable('WARMUP_ENABLED', 'True').lower() == 'true'
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+
+LOG_DIR = Path(get_env_variable('LOG_DIR', str(BASE_DIR / 'logs')))
+LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+# SQL statements slower than this are written to logs/slow_queries.log;
+# summarise with: python manage.py slow_query_report
+SLOW_QUERY_THRESHOLD_MS = float(get_env_variable('SLOW_QUERY_THRESHOLD_MS', '200'))
+
+# Application logs go to stdout as JSON lines through a background thread,
+# so a slow or full log pipe never blocks a request. LOG_SAMPLE_RATE keeps
+# that fraction of INFO/DEBUG records; warnings and errors are always kept.
+LOG_LEVEL = get_env_variable('LOG_LEVEL', 'INFO').upper()
+LOG_SAMPLE_RATE = float(get_env_variable('LOG_SAMPLE_RATE', '1.0'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+        'json': {'()': 'registrations.log.JsonFormatter'},
+    },
+    'filters': {
+        'sample': {'()': 'registrations.log.SamplingFilter', 'rate': LOG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'console': {
+            'class': 'registrations.log.NonBlockingStreamHandler',
+            'stream': 'ext://sys.stdout',
+            'formatter': 'json',
+            'filters': ['sample'],
+        },
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': LOG_DIR / 'slow_queries.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'registrations': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'registrations.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
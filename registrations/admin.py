@@ -1,3 +1,131 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
-# Register your models here.
+from .models import ArchivedRegistration, ArchivedTeamMember, CapacityQuota, OutboxEmail, Registration, TeamMember
+from .pagination import EstimatedCountPaginator
+from .quotas import recount_quotas
+from .search import search_registrations
+
+
+class TeamMemberInline(admin.TabularInline):
+    model = TeamMember
+    fields = ['order', 'name', 'level']
+    extra = 0
+    max_num = 5
+
+
+@admin.register(Registration)
+class RegistrationAdmin(admin.ModelAdmin):
+    list_display = ['team_leader_email', 'season', 'project_field', 'project_category', 'members_count', 'registration_date']
+    list_filter = ['season', 'project_field', 'project_category']
+    search_fields = ['team_leader_email']
+    search_help_text = 'Search by leader email prefix or member name'
+    readonly_fields = ['registration_date', 'updated_at']
+    inlines = [TeamMemberInline]
+    list_per_page = 50
+    # Large-table settings: no per-page COUNT(*) of the whole table and a
+    # statistics-based total on PostgreSQL
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_queryset(self, request):
+        # A correlated subquery is evaluated only for the rows on the page via
+        # the (registration, order) index, unlike a JOIN + GROUP BY over the table
+        members_count = (
+            TeamMember.objects.filter(registration=OuterRef('pk'))
+            .order_by()
+            .values('registration')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return super().get_queryset(request).annotate(
+            members_count=Coalesce(Subquery(members_count, output_field=IntegerField()), 0)
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        return search_registrations(queryset, search_term), False
+
+    @admin.display(description='Number of Members', ordering='members_count')
+    def members_count(self, obj):
+        return obj.members_count
+
+
+@admin.register(TeamMember)
+class TeamMemberAdmin(admin.ModelAdmin):
+    list_display = ['name', 'level', 'order', 'registration']
+    list_filter = ['level']
+    list_select_related = ['registration']
+    search_fields = ['name']
+    autocomplete_fields = ['registration']
+    list_per_page = 100
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+
+class ReadOnlyAdminMixin:
+    """Archived seasons are kept as they were; nothing is edited in place"""
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedTeamMemberInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedTeamMember
+    fields = ['order', 'name', 'level']
+
+
+@admin.register(ArchivedRegistration)
+class ArchivedRegistrationAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = ['team_leader_email', 'season', 'project_field', 'project_category', 'registration_date']
+    list_filter = ['season', 'project_field', 'project_category']
+    search_fields = ['team_leader_email', 'members__name']
+    inlines = [ArchivedTeamMemberInline]
+    list_per_page = 50
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'to_email', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to_email']
+    readonly_fields = ['registration', 'attempts', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+    list_per_page = 100
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    @admin.action(description='Retry selected emails now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboxEmail.STATUS_SENT).update(
+            status=OutboxEmail.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f'{updated} emails queued for the next send_outbox run')
+
+
+@admin.register(CapacityQuota)
+class CapacityQuotaAdmin(admin.ModelAdmin):
+    list_display = ['get_value_display', 'dimension', 'season', 'limit', 'used', 'remaining']
+    list_filter = ['season', 'dimension']
+    readonly_fields = ['used']
+    actions = ['recount']
+
+    @admin.display(description='Field or Category')
+    def get_value_display(self, obj):
+        return obj.get_value_display()
+
+    @admin.action(description='Recount teams for the selected seasons')
+    def recount(self, request, queryset):
+        seasons = sorted(set(queryset.values_list('season', flat=True)))
+        for season in seasons:
+            recount_quotas(season)
+        self.message_user(request, f'Recounted quotas for {", ".join(map(str, seasons))}')
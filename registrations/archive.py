@@ -0,0 +1,71 @@
+"""
+Moving closed seasons out of the live tables.
+
+archive_season() copies a season's registrations and members into the
+ArchivedRegistration/ArchivedTeamMember tables and deletes them from the live
+tables, one batch per transaction, so the uniqueness check, dashboard and
+exports only scan open seasons. Archived teams are read through the admin.
+"""
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .events import record_deletions
+from .models import ArchivedRegistration, ArchivedTeamMember, OutboxEmail, Registration, TeamMember
+from .purge import delete_rows
+from .rollup import rebuild_rollup
+from .search import remove_from_search_index
+from .versions import bump_version
+
+ARCHIVE_BATCH_SIZE = 1000
+
+_REGISTRATION_FIELDS = [
+    'id', 'team_leader_email', 'season', 'project_field', 'project_category',
+    'accept_terms', 'registration_date', 'updated_at',
+]
+_MEMBER_FIELDS = ['id', 'registration_id', 'name', 'level', 'order']
+
+
+def archive_batch(season, batch_size=ARCHIVE_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """Archive up to `batch_size` registrations of `season` in one
+    transaction; returns (registrations, members) moved"""
+    with transaction.atomic(using=using):
+        rows = list(
+            Registration.objects.using(using).filter(season=season)
+            .order_by('pk').values(*_REGISTRATION_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0, 0
+        ids = [row['id'] for row in rows]
+        members = list(TeamMember.objects.using(using).filter(registration_id__in=ids).values(*_MEMBER_FIELDS))
+
+        ArchivedRegistration.objects.using(using).bulk_create([ArchivedRegistration(**row) for row in rows])
+        ArchivedTeamMember.objects.using(using).bulk_create([ArchivedTeamMember(**member) for member in members])
+
+        remove_from_search_index(ids, using=using)
+        OutboxEmail.objects.using(using).filter(registration_id__in=ids).update(registration=None)
+        record_deletions(rows, using, archived=True)
+        bump_version(using)
+        # Plain DELETEs: the ORM would fire per-row signals that re-index and
+        # touch each team, which is wasted work for rows that are going away
+        delete_rows(using, TeamMember, 'registration_id', ids)
+        delete_rows(using, Registration, 'id', ids)
+    return len(rows), len(members)
+
+
+def archive_season(season, batch_size=ARCHIVE_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """Archive a closed season in batches, yielding the running totals of
+    (registrations, members) moved after each batch"""
+    if season >= settings.CURRENT_SEASON:
+        raise ValueError(f'Season {season} is not closed (the current season is {settings.CURRENT_SEASON})')
+    registrations = members = 0
+    while True:
+        moved, moved_members = archive_batch(season, batch_size, using)
+        if not moved:
+            break
+        registrations += moved
+        members += moved_members
+        yield registrations, members
+    if registrations:
+        # Batches delete with plain SQL, skipping the hourly rollup signals
+        rebuild_rollup(using)
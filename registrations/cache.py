@@ -0,0 +1,90 @@
+"""
+Cache helpers with stale-while-revalidate and single-flight recomputation.
+
+Values are stored in an envelope recording when they go stale. A fresh value
+is returned as is. A stale value is still served to every caller except the
+one that wins the recompute lock, so an expiry during a traffic spike costs
+one recomputation rather than one per worker. On a cold miss, callers that
+lose the lock wait briefly for the winner's result instead of piling onto
+the database.
+"""
+
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+# How often a caller that lost the lock on a cold miss checks for the result
+WAIT_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def _acquire(key, timeout):
+    """Try to take the recompute lock for `key`; returns a token or None"""
+    token = uuid.uuid4().hex
+    if cache.add(_lock_key(key), token, timeout):
+        return token
+    return None
+
+
+def _release(key, token):
+    # Only drop the lock if it is still ours, not one taken after ours expired
+    if cache.get(_lock_key(key)) == token:
+        cache.delete(_lock_key(key))
+
+
+def _store(key, value, ttl, stale_ttl):
+    cache.set(key, (value, time.time() + ttl), ttl + stale_ttl)
+
+
+def get_or_compute(key, compute, ttl, stale_ttl=0, lock_timeout=10):
+    """Return the cached value for `key`, calling `compute()` to refresh it.
+
+    Values are fresh for `ttl` seconds and may then be served stale for up to
+    `stale_ttl` more while a single caller recomputes them. `lock_timeout`
+    bounds how long a recompute may hold the lock and how long others wait.
+    """
+    envelope = cache.get(key)
+    if envelope is not None:
+        value, fresh_until = envelope
+        if time.time() < fresh_until:
+            return value
+        token = _acquire(key, lock_timeout)
+        if token is None:
+            return value
+        try:
+            value = compute()
+            _store(key, value, ttl, stale_ttl)
+        finally:
+            _release(key, token)
+        return value
+
+    token = _acquire(key, lock_timeout)
+    if token is None:
+        deadline = time.time() + lock_timeout
+        while time.time() < deadline:
+            time.sleep(WAIT_INTERVAL)
+            envelope = cache.get(key)
+            if envelope is not None:
+                return envelope[0]
+        # The lock holder died or is too slow; compute without the lock
+        value = compute()
+        _store(key, value, ttl, stale_ttl)
+        return value
+    try:
+        value = compute()
+        _store(key, value, ttl, stale_ttl)
+    finally:
+        _release(key, token)
+    return value
+
+
+def invalidate(*keys):
+    """Drop `keys` now and again once the current transaction commits, so a
+    reader that re-cached the pre-commit value in between is corrected"""
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,205 @@
+"""
+Response compression with Brotli and gzip.
+
+Responses whose content type is listed in settings.COMPRESSION_LEVELS are
+compressed with the encoding the client prefers by q-value among those
+configured, Brotli winning ties when the brotli package is installed; an
+encoding the client refuses with q=0 is never used. Small bodies,
+already-encoded responses, file downloads (FileResponse, which the server
+may send with sendfile) and static files (which WhiteNoise serves
+pre-compressed) are left alone. Streaming responses are compressed chunk by
+chunk and flushed after each chunk, so the client receives data as soon as
+the view yields it.
+
+Against BREACH, every compressed body carries up to MAX_RANDOM_BYTES of
+random padding, so its length does not reveal how well a secret in the page
+(such as the CSRF token) compressed: in the gzip header's file name field,
+as django.utils.text.compress_string does, and as a trailing comment in
+Brotli-compressed HTML.
+"""
+
+import secrets
+import string
+import struct
+import zlib
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip is offered
+    brotli = None
+
+
+# Upper bound of the random padding added to each compressed body, as in
+# django.middleware.gzip.GZipMiddleware
+MAX_RANDOM_BYTES = 100
+
+
+def encoding_qualities(header):
+    """{coding: q} from an Accept-Encoding header, including codings the
+    client refuses with q=0"""
+    qualities = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(header, levels):
+    """'br', 'gzip' or None for a request's Accept-Encoding and the levels
+    configured for the response's content type: the highest q wins, `*`
+    only stands in for codings not listed by name"""
+    qualities = encoding_qualities(header)
+    best, best_quality = None, 0
+    # Brotli first, so it wins ties
+    for coding in ('br', 'gzip'):
+        if coding not in levels or (coding == 'br' and brotli is None):
+            continue
+        quality = qualities.get(coding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def random_padding():
+    """1 to MAX_RANDOM_BYTES random ASCII letters"""
+    return ''.join(secrets.choice(string.ascii_letters) for _ in range(1 + secrets.randbelow(MAX_RANDOM_BYTES))).encode()
+
+
+class _Gzip:
+    def __init__(self, level, padding=b''):
+        # Raw deflate; the header and trailer are written here so the header
+        # can carry the padding as its file name (FNAME flag)
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        flags = b'\x08' if padding else b'\x00'
+        self.header = b'\x1f\x8b\x08' + flags + b'\x00\x00\x00\x00\x00\xff' + (padding + b'\x00' if padding else b'')
+        self.crc = 0
+        self.size = 0
+
+    def _start(self):
+        header, self.header = self.header, b''
+        return header
+
+    def process(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        return self._start() + self.compressor.compress(data)
+
+    def flush(self):
+        return self._start() + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        trailer = struct.pack('<II', self.crc & 0xffffffff, self.size & 0xffffffff)
+        return self._start() + self.compressor.flush(zlib.Z_FINISH) + trailer
+
+
+class _Brotli:
+    def __init__(self, quality, padding=b''):
+        self.compressor = brotli.Compressor(quality=quality)
+        # Brotli has no header field for it; only HTML gets padding, as a comment
+        self.trailer = b'<!-- ' + padding + b' -->' if padding else b''
+
+    def process(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.process(self.trailer) + self.compressor.finish()
+
+
+def compressor(encoding, level, padding=b''):
+    return _Brotli(level, padding) if encoding == 'br' else _Gzip(level, padding)
+
+
+def compress(data, encoding, level, padding=b''):
+    stream = compressor(encoding, level, padding)
+    return stream.process(data) + stream.finish()
+
+
+def compress_sequence(chunks, encoding, level, padding=b''):
+    stream = compressor(encoding, level, padding)
+    for chunk in chunks:
+        data = stream.process(chunk) + stream.flush()
+        if data:
+            yield data
+    yield stream.finish()
+
+
+async def acompress_sequence(chunks, encoding, level, padding=b''):
+    stream = compressor(encoding, level, padding)
+    async for chunk in chunks:
+        data = stream.process(chunk) + stream.flush()
+        if data:
+            yield data
+    yield stream.finish()
+
+
+class CompressionMiddleware:
+    """Compress responses per settings.COMPRESSION_LEVELS.
+
+    Placed above WhiteNoise and everything that builds the body, so it sees
+    the final content.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or request.path_info.startswith(settings.STATIC_URL):
+            return response
+        # Compressing would replace the file with a generator and lose sendfile
+        if isinstance(response, FileResponse):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        levels = settings.COMPRESSION_LEVELS.get(content_type)
+        if not levels:
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_LENGTH:
+            return response
+
+        # The response differs by Accept-Encoding whether or not this client gets it compressed
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), levels)
+        if encoding is None:
+            return response
+        level = levels[encoding]
+        padding = random_padding() if encoding == 'gzip' or content_type == 'text/html' else b''
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(response.streaming_content, encoding, level, padding)
+            else:
+                response.streaming_content = compress_sequence(response.streaming_content, encoding, level, padding)
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, encoding, level, padding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed body is not byte-identical to the original
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
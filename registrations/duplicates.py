@@ -0,0 +1,49 @@
+"""
+Finding the same student on several teams.
+
+Members are grouped by their normalised name key in one aggregate query
+(a hash or index-ordered GROUP BY on the database, covered by the
+(name_key, registration) index), so the cost grows linearly with the table
+rather than comparing every pair of names. Only teams of one season are
+compared, the current one by default: a student may join one team a year.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count
+
+from .models import TeamMember, current_season
+
+
+def _season_members(season):
+    return TeamMember.objects.filter(registration__isnull=False, registration__season=season or current_season())
+
+
+def duplicate_groups(min_teams=2, season=None):
+    """(name_key, number of teams) for keys appearing on at least `min_teams`
+    teams of `season` (default: the current one), most teams first"""
+    return (
+        _season_members(season)
+        .exclude(name_key='')
+        .order_by()
+        .values('name_key')
+        .annotate(teams=Count('registration', distinct=True))
+        .filter(teams__gte=min_teams)
+        .order_by('-teams', 'name_key')
+        .values_list('name_key', 'teams')
+    )
+
+
+def duplicate_report(min_teams=2, limit=100, season=None):
+    """The largest duplicate groups of `season` with the members and teams
+    in each"""
+    groups = list(duplicate_groups(min_teams, season)[:limit])
+    members = defaultdict(list)
+    rows = (
+        _season_members(season).filter(name_key__in=[key for key, _ in groups])
+        .select_related('registration')
+        .order_by('registration__registration_date')
+    )
+    for member in rows:
+        members[member.name_key].append(member)
+    return [{'name_key': key, 'teams': teams, 'members': members[key]} for key, teams in groups]
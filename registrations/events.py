@@ -0,0 +1,135 @@
+"""
+Change feed of registration events.
+
+Every change to a team appends a RegistrationEvent in the same transaction:
+'created' and 'updated' carry the team (registration fields and members) as
+it was after the change, 'deleted' carries its id, leader email and season.
+A consumer keeps the id of the last event it applied as a cursor and asks
+for the events after it, which is an index range scan over the new rows only.
+
+Events are served in commit order, not id order: ids are handed out at
+insert time, so a long transaction (an archive batch, say) can commit a low
+id after higher ones were read. On PostgreSQL each event records its
+transaction's id (txid_current()), events are ordered by (transaction id,
+id), and only events of transactions older than every running one are
+served, so nothing can later commit before an event already handed out.
+SQLite runs one write transaction at a time, so its ids already follow
+commit order and the transaction id is left at 0.
+
+Archiving and purging delete without signals but append the 'deleted'
+events themselves, marked "archived" or "purged". generate_registrations
+skips signals and writes no events; consumers load synthetic data from an
+export.
+"""
+
+import time
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import BigIntegerField, Func, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Registration, RegistrationEvent, TeamMember
+
+EVENTS_PAGE_SIZE = 100
+EVENTS_MAX_PAGE_SIZE = 1000
+
+# Seconds between checks for new events while a long-poll waits
+POLL_INTERVAL = 0.5
+
+_TEAM_FIELDS = [
+    'id', 'team_leader_email', 'season', 'project_field', 'project_category',
+    'registration_date', 'updated_at',
+]
+
+
+def team_snapshots(ids, using=DEFAULT_DB_ALIAS):
+    """{registration id: team payload} for the teams in `ids` that exist"""
+    teams = {row['id']: row for row in Registration.objects.using(using).filter(pk__in=ids).values(*_TEAM_FIELDS)}
+    for team in teams.values():
+        team['members'] = []
+    members = (
+        TeamMember.objects.using(using).filter(registration_id__in=list(teams))
+        .order_by('registration_id', 'order').values('registration_id', 'name', 'level', 'order')
+    )
+    for member in members:
+        teams[member.pop('registration_id')]['members'].append(member)
+    return teams
+
+
+def _transaction_id(using):
+    """RegistrationEvent.transaction_id for an insert on `using`; on
+    PostgreSQL an expression evaluated by the INSERT itself"""
+    if connections[using].vendor == 'postgresql':
+        return Func(function='txid_current', output_field=BigIntegerField())
+    return 0
+
+
+def record_created(registration, members, using=DEFAULT_DB_ALIAS):
+    """Append the 'created' event of a team saved together with its
+    `members`, built from the saved instances without reading them back"""
+    team = {field: getattr(registration, field) for field in _TEAM_FIELDS}
+    team['members'] = [
+        {'name': member.name, 'level': member.level, 'order': member.order}
+        for member in sorted(members, key=lambda member: member.order)
+    ]
+    RegistrationEvent.objects.using(using).create(
+        kind=RegistrationEvent.KIND_CREATED, registration_id=registration.pk, payload=team,
+        transaction_id=_transaction_id(using),
+    )
+
+
+def record_changes(kind, ids, using=DEFAULT_DB_ALIAS):
+    """Append a 'created' or 'updated' event for each team in `ids`"""
+    ids = {pk for pk in ids if pk is not None}
+    if not ids:
+        return
+    teams = team_snapshots(ids, using)
+    transaction_id = _transaction_id(using)
+    RegistrationEvent.objects.using(using).bulk_create([
+        RegistrationEvent(kind=kind, registration_id=pk, payload=team, transaction_id=transaction_id)
+        for pk, team in sorted(teams.items())
+    ])
+
+
+def record_deletions(teams, using=DEFAULT_DB_ALIAS, **extra):
+    """Append a 'deleted' event for each team, given dicts with at least
+    id, team_leader_email and season; `extra` is added to every payload"""
+    transaction_id = _transaction_id(using)
+    RegistrationEvent.objects.using(using).bulk_create([
+        RegistrationEvent(
+            kind=RegistrationEvent.KIND_DELETED,
+            registration_id=team['id'],
+            payload={'id': team['id'], 'team_leader_email': team['team_leader_email'], 'season': team['season'], **extra},
+            transaction_id=transaction_id,
+        )
+        for team in teams
+    ])
+
+
+def events_after(cursor, limit=EVENTS_PAGE_SIZE):
+    """Up to `limit` events after the `cursor` event id, in commit order
+    (see the module docstring)"""
+    events = RegistrationEvent.objects.all()
+    if cursor:
+        position = events.filter(pk=cursor).values_list('transaction_id', flat=True).first()
+        if position is None:
+            events = events.filter(pk__gt=cursor)
+        else:
+            events = events.filter(Q(transaction_id__gt=position) | Q(transaction_id=position, pk__gt=cursor))
+    if connections[events.db].vendor == 'postgresql':
+        # Transactions still running, or started since, all have ids at or
+        # above the snapshot's xmin
+        events = events.filter(transaction_id__lt=RawSQL('txid_snapshot_xmin(txid_current_snapshot())', []))
+    return list(events.order_by('transaction_id', 'pk')[:limit])
+
+
+def wait_for_events(cursor, limit=EVENTS_PAGE_SIZE, wait=0):
+    """events_after(), checking again every POLL_INTERVAL for up to `wait`
+    seconds while there is nothing new"""
+    deadline = time.monotonic() + wait
+    while True:
+        events = events_after(cursor, limit)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            return events
+        time.sleep(min(POLL_INTERVAL, remaining))
@@ -0,0 +1,259 @@
+"""
+CSV export of registrations, shared by the synchronous export_csv view and
+background export jobs.
+
+A background job writes into settings.EXPORT_SPOOL_DIR from a worker thread
+and reports progress on its ExportJob row. Jobs are keyed by a fingerprint of
+the registrations version (see registrations.versions) and the filters, so repeat requests for the same
+data snapshot reuse the finished file instead of exporting again.
+
+For offline exports of very large tables, parallel_export() splits the
+registration id space into ranges, exports each range to a part file in a
+separate process with its own database connection and concatenates the parts
+in id order (see the export_parallel command).
+"""
+
+import csv
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, close_old_connections, connection, connections, transaction,
+)
+from django.db.models import Max, Min
+from django.http import QueryDict
+from django.utils import timezone
+
+from .forms import RegistrationFilterForm
+from .models import ExportJob, Registration
+from .routers import replica_alias
+from .search import search_registrations
+from .slow_queries import log_slow_queries
+from .versions import registrations_version
+
+logger = logging.getLogger(__name__)
+
+EXPORT_HEADER = [
+    'Registration ID', 'Team Leader Email', 'Project Field', 'Project Category',
+    'Registration Date', 'Total Members', 'Member Names', 'Member Levels'
+]
+
+# Rows fetched (with their members) per round trip, and per progress update
+EXPORT_CHUNK_SIZE = 2000
+
+# A running job whose row has not been touched for this long is assumed dead
+# (e.g. its gunicorn worker was recycled) and is restarted on the next request
+STALLED_JOB_TIMEOUT = timedelta(minutes=5)
+
+
+def export_queryset(params, using=None):
+    """Registrations matching the dashboard filters and search in `params`"""
+    registrations = RegistrationFilterForm(params).filter(Registration.objects.db_manager(using).all())
+    return search_registrations(registrations, params.get('q', ''))
+
+
+def export_rows(registrations, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one CSV row per registration, streaming in chunks"""
+    registrations = registrations.prefetch_related('members')
+    for reg in registrations.iterator(chunk_size=chunk_size):
+        # Prefetched members are already ordered by `order`
+        members = list(reg.members.all())
+        yield [
+            reg.id,
+            reg.team_leader_email,
+            reg.project_field,
+            reg.project_category,
+            reg.registration_date,
+            len(members),
+            ', '.join([member.name for member in members]),
+            ', '.join([member.level for member in members]),
+        ]
+
+
+def export_fingerprint(params):
+    """Hash identifying the data an export with `params` would contain"""
+    filters = params.copy()
+    filters.pop('page', None)
+    fingerprint = f"{registrations_version()}:{filters.urlencode()}"
+    return hashlib.md5(fingerprint.encode()).hexdigest()
+
+
+def spool_path(job):
+    return Path(settings.EXPORT_SPOOL_DIR) / job.file_name
+
+
+def _is_reusable(job):
+    if job.status == ExportJob.STATUS_DONE:
+        return spool_path(job).exists()
+    if job.status in (ExportJob.STATUS_PENDING, ExportJob.STATUS_RUNNING):
+        return timezone.now() - job.updated_at < STALLED_JOB_TIMEOUT
+    return False
+
+
+def get_or_start_export_job(params, user=None):
+    """Return the job for the current snapshot of `params`, starting one if
+    no usable job exists; returns (job, created)"""
+    key = export_fingerprint(params)
+    job = ExportJob.objects.filter(snapshot_key=key).first()
+    if job is not None and _is_reusable(job):
+        return job, False
+
+    purge_expired_jobs()
+    filters = params.copy()
+    filters.pop('page', None)
+    try:
+        with transaction.atomic():
+            if job is not None:
+                job.delete()
+            job = ExportJob.objects.create(
+                snapshot_key=key,
+                params=filters.urlencode(),
+                created_by=user if user is not None and user.is_authenticated else None,
+                file_name=f'{key}.csv',
+            )
+    except IntegrityError:
+        # A concurrent request created the job for this snapshot first
+        return ExportJob.objects.get(snapshot_key=key), False
+    # Start after commit so the worker can see the job row
+    transaction.on_commit(lambda: start_export_job(job.pk))
+    return job, True
+
+
+def start_export_job(job_id):
+    """Run an export job on a background thread"""
+    threading.Thread(target=run_export_job, args=(job_id,), name=f'export-{job_id}', daemon=True).start()
+
+
+def run_export_job(job_id):
+    """Generate the CSV for a job, writing to a temporary file that is renamed
+    into place once complete so downloads never see a partial file"""
+    close_old_connections()
+    with log_slow_queries('export_job'):
+        _run_export_job(job_id)
+
+
+def _run_export_job(job_id):
+    job = ExportJob.objects.get(pk=job_id)
+    target = spool_path(job)
+    partial = target.with_suffix('.part')
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Worker threads are outside request routing; read from a replica explicitly
+        registrations = export_queryset(QueryDict(job.params), using=replica_alias())
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.STATUS_RUNNING, total_rows=registrations.count(), updated_at=timezone.now()
+        )
+        with open(partial, 'w', newline='', encoding='utf-8') as output:
+            writer = csv.writer(output)
+            writer.writerow(EXPORT_HEADER)
+            written = 0
+            for row in export_rows(registrations):
+                writer.writerow(row)
+                written += 1
+                if written % EXPORT_CHUNK_SIZE == 0:
+                    ExportJob.objects.filter(pk=job.pk).update(rows_written=written, updated_at=timezone.now())
+        os.replace(partial, target)
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.STATUS_DONE, rows_written=written,
+            finished_at=timezone.now(), updated_at=timezone.now()
+        )
+    except Exception as e:
+        logger.exception('Export job %s failed', job_id)
+        partial.unlink(missing_ok=True)
+        ExportJob.objects.filter(pk=job.pk).update(
+            status=ExportJob.STATUS_FAILED, error=str(e),
+            finished_at=timezone.now(), updated_at=timezone.now()
+        )
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def purge_expired_jobs():
+    """Delete jobs and spool files older than settings.EXPORT_JOB_RETENTION_HOURS"""
+    cutoff = timezone.now() - timedelta(hours=settings.EXPORT_JOB_RETENTION_HOURS)
+    expired = ExportJob.objects.filter(created_at__lt=cutoff).exclude(status=ExportJob.STATUS_RUNNING)
+    for job in expired:
+        if job.file_name:
+            spool_path(job).unlink(missing_ok=True)
+    expired.delete()
+
+
+def id_ranges(low, high, parts):
+    """Split ids low..high (inclusive) into at most `parts` half-open ranges"""
+    if low is None:
+        return []
+    step = max(-(-(high - low + 1) // parts), 1)
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+def write_csv(path, rows, header=True):
+    """Write `rows` to a CSV file; returns the number of rows written"""
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        if header:
+            writer.writerow(EXPORT_HEADER)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def _init_export_worker():
+    # Spawned workers start without Django; forked ones already have it
+    if not apps.ready:
+        import django
+        django.setup()
+
+
+def export_range(params, start, end, path, using=DEFAULT_DB_ALIAS):
+    """Export registrations with start <= id < end matching `params` (an
+    urlencoded filter string) to a headerless part file; runs in a worker"""
+    registrations = export_queryset(QueryDict(params), using=using).filter(pk__gte=start, pk__lt=end).order_by('pk')
+    return write_csv(path, export_rows(registrations), header=False)
+
+
+def parallel_export(path, params='', workers=None, parts=None, using=DEFAULT_DB_ALIAS):
+    """Export registrations matching `params` to `path` in id order using a
+    pool of worker processes; returns the number of rows written.
+
+    The id space is cut into more ranges than workers (four per worker by
+    default) so gaps left by deleted or archived teams even out across the pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    parts = parts or workers * 4
+    bounds = export_queryset(QueryDict(params), using=using).aggregate(low=Min('pk'), high=Max('pk'))
+    ranges = id_ranges(bounds['low'], bounds['high'], parts)
+
+    target = Path(path)
+    partial = target.with_name(target.name + '.part')
+    part_paths = [target.with_name(f'{target.name}.{index:04d}.part') for index in range(len(ranges))]
+    # Forked workers must not share the parent's open database connections
+    connections.close_all()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_export_worker) as pool:
+            futures = [
+                pool.submit(export_range, params, start, end, str(part), using)
+                for (start, end), part in zip(ranges, part_paths)
+            ]
+            written = sum(future.result() for future in futures)
+        with open(partial, 'w', newline='', encoding='utf-8') as output:
+            csv.writer(output).writerow(EXPORT_HEADER)
+            for part in part_paths:
+                with open(part, encoding='utf-8', newline='') as source:
+                    shutil.copyfileobj(source, output)
+        os.replace(partial, target)
+    finally:
+        partial.unlink(missing_ok=True)
+        for part in part_paths:
+            part.unlink(missing_ok=True)
+    return written
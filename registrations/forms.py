@@ -1,6 +1,8 @@
 import re
+from datetime import datetime, time, timedelta
 from django import forms
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from .models import Registration, TeamMember
 
 def validate_english_only(value):
@@ -206,7 +208,7 @@ class RegistrationForm(forms.ModelForm):
         email = self.cleaned_data['team_leader_email']
         
         # Check uniqueness
-        if Registration.objects.filter(team_leader_email=email).exists():
+        if Registration.email_exists(email):
             raise forms.ValidationError('This email is already registered in the system')
         
         return email
@@ -308,4 +310,72 @@ class RegistrationForm(forms.ModelForm):
         elif total_members > 5:
             self.add_error(None, 'Maximum 5 team members allowed')
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+class RegistrationFilterForm(forms.Form):
+    """Dashboard and export filters, each backed by a composite index on Registration"""
+    project_field = forms.ChoiceField(
+        choices=[('', 'All Fields')] + Registration.PROJECT_FIELD_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'filter-select'})
+    )
+    
+    project_category = forms.ChoiceField(
+        choices=[('', 'All Categories')] + Registration.PROJECT_CATEGORY_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'filter-select'})
+    )
+    
+    date_from = forms.DateField(
+        label='From',
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'filter-date'})
+    )
+    
+    date_to = forms.DateField(
+        label='To',
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'filter-date'})
+    )
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            self.add_error('date_to', 'End date must not be before start date')
+        return cleaned_data
+    
+    @staticmethod
+    def _start_of_day(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+    
+    def as_filters(self):
+        """The valid filters as project_field, project_category, date_from
+        and date_to (aware datetimes, date_to exclusive); empty values are
+        None and invalid input filters nothing"""
+        if not self.is_valid():
+            return {}
+        
+        data = self.cleaned_data
+        return {
+            'project_field': data['project_field'] or None,
+            'project_category': data['project_category'] or None,
+            'date_from': self._start_of_day(data['date_from']) if data['date_from'] else None,
+            'date_to': self._start_of_day(data['date_to'] + timedelta(days=1)) if data['date_to'] else None,
+        }
+    
+    def filter(self, queryset):
+        """Apply the valid filters to `queryset`; invalid input filters nothing"""
+        filters = self.as_filters()
+        if filters.get('project_field'):
+            queryset = queryset.filter(project_field=filters['project_field'])
+        if filters.get('project_category'):
+            queryset = queryset.filter(project_category=filters['project_category'])
+        # Compare the raw column against day boundaries rather than using
+        # registration_date__date, which wraps the column and defeats the index
+        if filters.get('date_from'):
+            queryset = queryset.filter(registration_date__gte=filters['date_from'])
+        if filters.get('date_to'):
+            queryset = queryset.filter(registration_date__lt=filters['date_to'])
+        return queryset
@@ -0,0 +1,100 @@
+"""
+Non-blocking structured logging.
+
+NonBlockingStreamHandler hands records to a QueueListener thread that formats
+and writes them, so a request thread never waits on stdout or a backed-up log
+pipe. The queue is bounded and records are dropped (and counted) when it is
+full rather than blocking. JsonFormatter writes one JSON object per line with
+any `extra` fields, and SamplingFilter thins out high-volume INFO/DEBUG logs.
+"""
+
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON including `extra` fields"""
+
+    def format(self, record):
+        payload = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        payload.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exception'] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a `rate` fraction of records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class NonBlockingStreamHandler(QueueHandler):
+    """Queue records for a background thread that writes them to `stream`"""
+
+    def __init__(self, stream=None, maxsize=10000):
+        self.target = logging.StreamHandler(stream)
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.listener = None
+        super().__init__(queue.Queue(maxsize))
+        self._start_listener()
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self.pid = os.getpid()
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread, in the target handler
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Make the record safe to hand to another thread without formatting it here"""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            # Forked after start-up (e.g. gunicorn --preload): the listener
+            # thread did not survive the fork, so start a fresh one
+            self.queue = queue.Queue(self.maxsize)
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None and self.pid == os.getpid():
+            # Drains queued records before returning
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from registrations.archive import ARCHIVE_BATCH_SIZE, archive_season
+from registrations.models import Registration
+
+
+class Command(BaseCommand):
+    help = 'Move a closed season from the live tables into the archive tables, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('season', type=int, help='Season (year) to archive')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Registrations per transaction')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to archive in')
+
+    def handle(self, *args, **options):
+        season, using = options['season'], options['database']
+        if season >= settings.CURRENT_SEASON:
+            raise CommandError(f'Season {season} is not closed; the current season is {settings.CURRENT_SEASON}')
+        total = Registration.objects.using(using).filter(season=season).count()
+        if not total:
+            self.stdout.write(f'No live registrations for season {season}.')
+            return
+
+        started = time.perf_counter()
+        registrations = members = 0
+        for registrations, members in archive_season(season, options['batch_size'], using):
+            self.stdout.write(f'{registrations}/{total} registrations archived')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {registrations} registrations and {members} members of season {season} in {elapsed:.1f}s'
+        ))
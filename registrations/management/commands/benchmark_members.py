@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from registrations.models import Registration, TeamMember
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark rows"""
+
+
+class Command(BaseCommand):
+    help = 'Measure team member insert and read cost; all rows are rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=2000, help='Number of teams to insert')
+        parser.add_argument('--members', type=int, default=3, help='Members per team')
+
+    def handle(self, *args, **options):
+        teams, per_team = options['teams'], options['members']
+        try:
+            with transaction.atomic():
+                self.run(teams, per_team)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_team(self, i, per_team):
+        """Same statements as handle_registration_submission"""
+        with transaction.atomic():
+            registration = Registration.objects.create(
+                team_leader_email=f'benchmark{i}@example.com',
+                project_field='health',
+                project_category='prototype',
+                accept_terms=True
+            )
+            TeamMember.objects.bulk_create([
+                TeamMember(registration=registration, name=f'Member {i} {order}', level='bachelor', order=order)
+                for order in range(1, per_team + 1)
+            ])
+
+    def run(self, teams, per_team):
+        with CaptureQueriesContext(connection) as ctx:
+            self.create_team(0, per_team)
+        member_inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "registrations_teammember"')]
+
+        started = time.perf_counter()
+        for i in range(1, teams):
+            self.create_team(i, per_team)
+        insert_seconds = time.perf_counter() - started
+        self.stdout.write(f'Insert: {insert_seconds / max(teams - 1, 1) * 1000:.2f} ms/team, '
+                          f'{len(ctx)} queries/team, '
+                          f'{len(member_inserts)} member INSERT(s) for {per_team} members')
+
+        started = time.perf_counter()
+        rows = [
+            (registration.team_leader_email, [member.name for member in registration.members.all()])
+            for registration in Registration.objects.prefetch_related('members')
+        ]
+        read_seconds = time.perf_counter() - started
+        with CaptureQueriesContext(connection) as ctx:
+            list(Registration.objects.prefetch_related('members')[:1])
+        member_sql = ctx.captured_queries[-1]['sql']
+        self.stdout.write(f'Read: {len(rows)} teams with members in {read_seconds * 1000:.1f} ms, '
+                          f'{len(ctx)} queries, member query joins: {member_sql.count(" JOIN ")}')
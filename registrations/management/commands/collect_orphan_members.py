@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from registrations.models import TeamMember
+from registrations.purge import PURGE_BATCH_SIZE, collect_orphan_members
+
+
+class Command(BaseCommand):
+    help = 'Delete team members that belong to no registration, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE, help='Members deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the orphaned members')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to clean')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        started = time.perf_counter()
+        if options['dry_run']:
+            orphans = TeamMember.objects.using(using).filter(registration__isnull=True).count()
+            self.stdout.write(f'{orphans} orphaned members ({time.perf_counter() - started:.2f}s)')
+            return
+
+        removed = 0
+        for removed in collect_orphan_members(options['batch_size'], using):
+            self.stdout.write(f'{removed} orphaned members removed')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} orphaned members in {elapsed:.2f}s'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from registrations.duplicates import duplicate_groups, duplicate_report
+
+
+class Command(BaseCommand):
+    help = 'List students registered on more than one team, matched by normalised name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-teams', type=int, default=2, help='Only show names on at least this many teams')
+        parser.add_argument('--limit', type=int, default=50, help='Number of names to show in detail')
+        parser.add_argument('--season', type=int, help='Season to check (default: the current one)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = duplicate_groups(options['min_teams'], options['season']).count()
+        report = duplicate_report(options['min_teams'], options['limit'], options['season'])
+        elapsed = time.perf_counter() - started
+
+        if not report:
+            self.stdout.write(f'No duplicate members found ({elapsed:.2f}s).')
+            return
+        for group in report:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{group['members'][0].name}: {group['teams']} teams"))
+            for member in group['members']:
+                self.stdout.write(
+                    f"  {member.name} ({member.get_level_display()}) - "
+                    f"{member.registration.team_leader_email}, season {member.registration.season}"
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} duplicated names; showing {len(report)} ({elapsed:.2f}s)'
+        ))
@@ -0,0 +1,139 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from registrations.models import Registration, TeamMember
+from registrations.quotas import recount_quotas
+from registrations.rollup import rebuild_rollup
+from registrations.search import rebuild_search_index
+
+# (choices, relative weights), roughly following past editions
+FIELDS = (['health', 'energy', 'environment'], [45, 30, 25])
+CATEGORIES = (['student_research', 'published_research', 'prototype', 'science_communication'], [40, 15, 30, 15])
+TEAM_SIZES = ([2, 3, 4, 5], [35, 35, 20, 10])
+LEVELS = (['bachelor', 'master', 'phd'], [70, 20, 10])
+
+FIRST_NAMES = [
+    'Ahmed', 'Mohamed', 'Omar', 'Youssef', 'Mahmoud', 'Ali', 'Hassan', 'Karim', 'Mostafa', 'Khaled',
+    'Fatma', 'Sara', 'Nour', 'Mariam', 'Salma', 'Aya', 'Hana', 'Yasmin', 'Laila', 'Zeinab',
+]
+LAST_NAMES = [
+    'Mohamed', 'Ahmed', 'Hassan', 'Ibrahim', 'Khalil', 'Mahmoud', 'Abdelrahman', 'Saleh', 'Adel', 'Fathy',
+    'Mansour', 'Nasser', 'Samir', 'Ezzat', 'Farouk', 'Hamdy', 'Ragab', 'Sayed', 'Tawfik', 'Zaki',
+]
+EMAIL_DOMAINS = ['cu.edu.eg', 'gmail.com', 'yahoo.com', 'outlook.com', 'eng.cu.edu.eg']
+
+
+def _pick(rng, weighted):
+    choices, weights = weighted
+    return rng.choices(choices, weights)[0]
+
+
+def synthetic_team(rng, seed, index, end, window):
+    """One unsaved registration and its members. Each team draws the same
+    sequence of random numbers, so output does not depend on the chunk size."""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    # Sign-ups cluster towards the deadline at the end of the window
+    registered = end - timedelta(seconds=window - rng.triangular(0, window, window))
+    registration = Registration(
+        team_leader_email=f'{first}.{last}.{seed}-{index}@{rng.choice(EMAIL_DOMAINS)}'.lower(),
+        project_field=_pick(rng, FIELDS),
+        project_category=_pick(rng, CATEGORIES),
+        accept_terms=True,
+        registration_date=registered,
+        updated_at=registered,
+    )
+    members = [TeamMember(name=f'{first} {last}', level=_pick(rng, LEVELS), order=1)]
+    for order in range(2, _pick(rng, TEAM_SIZES) + 1):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        members.append(TeamMember(name=name, level=_pick(rng, LEVELS), order=order))
+    return registration, members
+
+
+@contextmanager
+def explicit_timestamps():
+    """Let bulk_create keep the registration_date/updated_at we assign
+    instead of stamping every row with the current time"""
+    fields = [Registration._meta.get_field('registration_date'), Registration._meta.get_field('updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = ('Insert synthetic registrations with realistic field, category, team size and level '
+            'distributions; the same --seed reproduces the same rows')
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of registrations to create')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--offset', type=int, default=0,
+                            help='Index of the first registration, to extend an earlier run with the same seed')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Registrations inserted per transaction')
+        parser.add_argument('--days', type=int, default=60, help='Spread registration dates over this many days')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to fill')
+
+    def handle(self, *args, **options):
+        count, seed, offset = options['count'], options['seed'], options['offset']
+        chunk_size, using = options['chunk_size'], options['database']
+        if count < 1 or chunk_size < 1:
+            raise CommandError('count and --chunk-size must be positive')
+
+        # Dates count back from the start of today, so a rerun on the same
+        # day reproduces them exactly
+        end = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        window = timedelta(days=options['days']).total_seconds()
+
+        probe, _ = synthetic_team(random.Random(f'{seed}:{offset}'), seed, offset, end, window)
+        if Registration.objects.using(using).filter(team_leader_email=probe.team_leader_email).exists():
+            raise CommandError(f'Registrations for seed {seed} at offset {offset} already exist; '
+                               'pass another --seed or --offset')
+
+        rng = random.Random(f'{seed}:{offset}')
+        started = time.perf_counter()
+        created = members_created = 0
+        with explicit_timestamps():
+            for chunk_start in range(offset, offset + count, chunk_size):
+                chunk_end = min(chunk_start + chunk_size, offset + count)
+                teams = [synthetic_team(rng, seed, i, end, window) for i in range(chunk_start, chunk_end)]
+                with transaction.atomic(using=using):
+                    registrations = Registration.objects.using(using).bulk_create(
+                        [registration for registration, _ in teams]
+                    )
+                    members = []
+                    for registration, (_, team) in zip(registrations, teams):
+                        for member in team:
+                            member.registration_id = registration.pk
+                            members.append(member)
+                    # The search index is rebuilt once at the end instead
+                    TeamMember.objects.using(using).bulk_create(members, reindex=False)
+                created += len(registrations)
+                members_created += len(members)
+                rate = created / (time.perf_counter() - started)
+                self.stdout.write(f'{created}/{count} registrations ({rate:.0f}/s)')
+
+        rebuild_search_index(using=using)
+        # Bulk inserts skip the signals that count quota places and hourly buckets
+        recount_quotas(using=using)
+        rebuild_rollup(using=using)
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            # Refresh planner statistics so the row estimates used for
+            # pagination reflect the new table size straight away
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE registrations_registration, registrations_teammember')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} registrations and {members_created} members in {elapsed:.1f}s'
+        ))
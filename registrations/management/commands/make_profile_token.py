@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from registrations.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed X-Profile-Token header value for profiling a request'
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write(f'Valid for {settings.PROFILER_TOKEN_MAX_AGE} seconds, e.g.:\n'
+                          f'  curl -H "X-Profile-Token: <token>" https://host/path')
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    help = ('Run migrate only when the database is missing migrations; start.sh uses it so a boot '
+            'with an up-to-date schema skips migrate\'s checks and post-migrate signals')
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to migrate')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        using = options['database']
+        executor = MigrationExecutor(connections[using])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'No migrations to apply (checked in {elapsed:.2f}s)'))
+            return
+        self.stdout.write(f'{len(plan)} migrations to apply')
+        call_command('migrate', database=using, run_syncdb=True, stdout=self.stdout)
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from registrations.purge import PURGE_BATCH_SIZE, purge_registrations
+
+
+class Command(BaseCommand):
+    help = ('Delete every live registration and team member (TRUNCATE on PostgreSQL, '
+            'batched DELETEs elsewhere); archived seasons are kept')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not ask for confirmation')
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE,
+                            help='Rows deleted per transaction where TRUNCATE is not used')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to purge')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['interactive']:
+            answer = input(f"This deletes ALL live registrations and team members in '{using}'. Type 'yes' to continue: ")
+            if answer != 'yes':
+                raise CommandError('Purge cancelled.')
+
+        started = time.perf_counter()
+        registrations, members = purge_registrations(options['batch_size'], using)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {registrations} registrations and {members} members in {elapsed:.2f}s'
+        ))
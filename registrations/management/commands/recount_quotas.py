@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from registrations.models import CapacityQuota, current_season
+from registrations.quotas import recount_quotas
+
+
+class Command(BaseCommand):
+    help = ('Reset capacity quota counters from the registration table, e.g. after generate_registrations '
+            'or other bulk changes that skip the model signals')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--season', type=int, help='Season to recount (default: the current season)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to recount in')
+
+    def handle(self, *args, **options):
+        season, using = options['season'] or current_season(), options['database']
+        updated = recount_quotas(season, using=using)
+        for quota in CapacityQuota.objects.using(using).filter(season=season):
+            self.stdout.write(f'{quota.get_value_display()}: {quota.used}/{quota.limit}')
+        self.stdout.write(self.style.SUCCESS(f'Recounted {updated} quotas for season {season}'))
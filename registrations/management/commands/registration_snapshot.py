@@ -0,0 +1,48 @@
+import time as timer
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from registrations.snapshot import RegistrationSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Build the in-memory registration snapshot and report its load time, footprint and query speed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=1000, help='Statistics calls to time per filter')
+
+    def timed(self, snapshot, label, filters, repeat):
+        started = timer.perf_counter()
+        for _ in range(repeat):
+            snapshot.stats(**filters)
+        per_call = (timer.perf_counter() - started) / repeat
+        self.stdout.write(f'Statistics for {label}: {per_call * 1e6:.1f}µs')
+
+    def handle(self, *args, **options):
+        started = timer.perf_counter()
+        snapshot = RegistrationSnapshot.load()
+        loaded = timer.perf_counter() - started
+        teams = len(snapshot)
+        size = snapshot.nbytes()
+        self.stdout.write(f'Loaded {teams} registrations in {loaded:.2f}s')
+        if not teams:
+            return
+        per_100k = size / teams * 100000
+        self.stdout.write(f'Footprint: {size / 1024:.0f} KiB ({per_100k / 1024 / 1024:.2f} MiB per 100k registrations)')
+
+        repeat = options['repeat']
+        self.timed(snapshot, 'all teams', {}, repeat)
+        self.timed(snapshot, 'one field and category', {'project_field': 'health', 'project_category': 'prototype'}, repeat)
+        # The middle half of the registration dates, as whole days like the
+        # dashboard's filters and as exact times, which scan the arrays
+        dates = sorted(snapshot.dates)
+        start = datetime.fromtimestamp(dates[teams // 4], dt_timezone.utc)
+        end = datetime.fromtimestamp(dates[3 * teams // 4], dt_timezone.utc)
+        days = {
+            'date_from': timezone.make_aware(datetime.combine(timezone.localdate(start), time.min)),
+            'date_to': timezone.make_aware(datetime.combine(timezone.localdate(end), time.min)),
+        }
+        self.timed(snapshot, 'a range of days', days, repeat)
+        self.timed(snapshot, 'an exact time range', {'date_from': start, 'date_to': end}, max(repeat // 100, 1))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from registrations.outbox import OUTBOX_BATCH_SIZE, send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches over one mail connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE, help='Emails per batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails instead of exiting when drained')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        started = time.perf_counter()
+        while True:
+            sent, failed = send_pending(options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f'Batch: {sent} sent, {failed} failed')
+            elif options['loop']:
+                time.sleep(options['interval'])
+            else:
+                break
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {total_sent} emails, {total_failed} failed (will retry) in {elapsed:.1f}s'
+        ))
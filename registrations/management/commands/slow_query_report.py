@@ -0,0 +1,54 @@
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Summarise the slow-query log by query fingerprint, worst total time first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=str(Path(settings.LOG_DIR) / 'slow_queries.log'),
+                            help='Slow-query log file; rotated siblings (.1, .2, ...) are read too')
+        parser.add_argument('--top', type=int, default=10, help='Number of fingerprints to show')
+        parser.add_argument('--view', help='Only include queries issued by this view')
+
+    def read_entries(self, log_path):
+        paths = sorted(log_path.parent.glob(log_path.name + '.*'), reverse=True) + [log_path]
+        for path in paths:
+            if not path.exists():
+                continue
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for entry in self.read_entries(Path(options['log'])):
+            if options['view'] and entry.get('view') != options['view']:
+                continue
+            groups[entry['fingerprint']].append(entry)
+
+        if not groups:
+            self.stdout.write('No slow queries logged.')
+            return
+
+        ranked = sorted(groups.values(), key=lambda entries: sum(e['duration_ms'] for e in entries), reverse=True)
+        for rank, entries in enumerate(ranked[:options['top']], start=1):
+            durations = [e['duration_ms'] for e in entries]
+            views = Counter(e['view'] for e in entries)
+            frames = Counter(e['frame'] for e in entries)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank} {entries[0]['fingerprint']}: {len(entries)} calls, "
+                f"total {sum(durations):.0f} ms, mean {sum(durations) / len(durations):.1f} ms, "
+                f"max {max(durations):.1f} ms"
+            ))
+            self.stdout.write(f"  SQL:    {entries[0]['sql'][:300]}")
+            self.stdout.write(f"  Params: {entries[0]['params']}")
+            self.stdout.write('  Views:  ' + ', '.join(f'{view} ({count})' for view, count in views.most_common(3)))
+            self.stdout.write('  Frames: ' + ', '.join(f'{frame} ({count})' for frame, count in frames.most_common(3)))
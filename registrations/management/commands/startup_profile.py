@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from registrations.warmup import warm_up
+
+# What a gunicorn worker imports when it loads the application
+STARTUP_IMPORT = 'import registration_system.wsgi'
+
+
+def parse_importtime(output):
+    """[(module, self µs, cumulative µs)] from `python -X importtime` output"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        modules.append((module.strip(), int(own), int(cumulative)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ('Report where a cold start spends its time: module import times when loading the WSGI '
+            'application (python -X importtime), then the worker warm-up steps')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='Modules and packages to list')
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_IMPORT],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        elapsed = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(f'Loading the application failed:\n{result.stderr[-2000:]}')
+        modules = parse_importtime(result.stderr)
+        total = sum(own for _, own, _ in modules)
+        self.stdout.write(f'Application loaded in {elapsed:.2f}s ({len(modules)} modules, {total / 1e6:.2f}s importing)')
+
+        packages = {}
+        for module, own, _ in modules:
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0) + own
+        self.stdout.write('\nImport time per top-level package (self):')
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f'{own / 1000:9.1f}ms  {own / total:6.1%}  {package}')
+
+        self.stdout.write('\nSlowest modules (cumulative, including their imports):')
+        for module, _, cumulative in sorted(modules, key=lambda row: -row[2])[:limit]:
+            self.stdout.write(f'{cumulative / 1000:9.1f}ms  {module}')
+
+        self.stdout.write('\nWarm-up steps:')
+        for step, seconds, error in warm_up():
+            self.stdout.write(f'{seconds * 1000:9.1f}ms  {step}' + (f'  (failed: {error})' if error else ''))
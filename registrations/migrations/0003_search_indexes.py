@@ -0,0 +1,51 @@
+from django.db import migrations
+
+POSTGRES_INDEXES = [
+    ('registrations_email_trgm', 'registrations_registration', 'team_leader_email'),
+    ('registrations_member_name_trgm', 'registrations_teammember', 'name'),
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, table, column in POSTGRES_INDEXES:
+            # Matches the UPPER(col::text) LIKE UPPER(...) SQL Django emits for i-lookups
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                f"USING gin (UPPER({column}::text) gin_trgm_ops)"
+            )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS registrations_search "
+            "USING fts5(email, members, tokenize='trigram')"
+        )
+        schema_editor.execute("""
+            INSERT INTO registrations_search (rowid, email, members)
+            SELECT r.id, r.team_leader_email, COALESCE(GROUP_CONCAT(m.name, ' | '), '')
+            FROM registrations_registration r
+            LEFT JOIN registrations_registration_members rm ON rm.registration_id = r.id
+            LEFT JOIN registrations_teammember m ON m.id = rm.teammember_id
+            GROUP BY r.id
+        """)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for name, table, column in POSTGRES_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+    elif vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS registrations_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0002_alter_registration_options_alter_teammember_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_registration(apps, schema_editor):
+    """Copy each member's team from the many-to-many through table"""
+    TeamMember = apps.get_model('registrations', 'TeamMember')
+    Through = apps.get_model('registrations', 'Registration').members.through
+    db_alias = schema_editor.connection.alias
+
+    # One set-based UPDATE for the common case of a member on a single team
+    schema_editor.execute("""
+        UPDATE registrations_teammember
+        SET registration_id = (
+            SELECT MIN(rm.registration_id)
+            FROM registrations_registration_members rm
+            WHERE rm.teammember_id = registrations_teammember.id
+        )
+    """)
+
+    # A member linked to several teams gets a copy per extra team
+    shared = (
+        Through.objects.using(db_alias).values('teammember_id')
+        .annotate(teams=models.Count('registration_id'))
+        .filter(teams__gt=1)
+        .values_list('teammember_id', flat=True)
+    )
+    for member in TeamMember.objects.using(db_alias).filter(id__in=list(shared)):
+        extra_links = Through.objects.using(db_alias).filter(teammember_id=member.id).exclude(
+            registration_id=member.registration_id
+        )
+        TeamMember.objects.using(db_alias).bulk_create([
+            TeamMember(registration_id=link.registration_id, name=member.name, level=member.level, order=member.order)
+            for link in extra_links
+        ])
+
+
+def restore_through_rows(apps, schema_editor):
+    """Rebuild the many-to-many links from the foreign key"""
+    TeamMember = apps.get_model('registrations', 'TeamMember')
+    Through = apps.get_model('registrations', 'Registration').members.through
+    db_alias = schema_editor.connection.alias
+    links = TeamMember.objects.using(db_alias).filter(registration__isnull=False).values_list('id', 'registration_id')
+    Through.objects.using(db_alias).bulk_create(
+        [Through(teammember_id=member_id, registration_id=registration_id) for member_id, registration_id in links.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0003_search_indexes'),
+    ]
+
+    operations = [
+        # No reverse accessor yet: `members` is still taken by the many-to-many
+        migrations.AddField(
+            model_name='teammember',
+            name='registration',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='registrations.registration', verbose_name='Team Registration'),
+        ),
+        migrations.RunPython(backfill_registration, restore_through_rows),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """Drop the many-to-many once 0004 has backfilled the foreign key; kept
+    separate so PostgreSQL commits the backfill before the schema changes"""
+
+    dependencies = [
+        ('registrations', '0004_teammember_registration_fk'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='registration',
+            name='members',
+        ),
+        migrations.AlterField(
+            model_name='teammember',
+            name='registration',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='members', to='registrations.registration', verbose_name='Team Registration'),
+        ),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['registration', 'order'], name='teammember_registration_order'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0005_remove_registration_members'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['-registration_date'], name='reg_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['project_field', '-registration_date'], name='reg_field_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['project_category', '-registration_date'], name='reg_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['project_field', 'project_category', '-registration_date'], name='reg_field_cat_date_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:36
+
+import django.db.models.deletion
+import registrations.models
+from django.db import migrations, models
+from django.db.models.functions import ExtractYear
+
+
+def backfill_season(apps, schema_editor):
+    """Existing registrations belong to the season of the year they were made in"""
+    Registration = apps.get_model('registrations', 'Registration')
+    Registration.objects.using(schema_editor.connection.alias).update(season=ExtractYear('registration_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0007_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedRegistration',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('team_leader_email', models.EmailField(max_length=254, verbose_name='Team Leader Email')),
+                ('season', models.PositiveSmallIntegerField(verbose_name='Season')),
+                ('project_field', models.CharField(choices=[('health', 'Health'), ('energy', 'Energy'), ('environment', 'Environment')], max_length=20, verbose_name='Project Field')),
+                ('project_category', models.CharField(choices=[('student_research', 'Student Research Project'), ('published_research', 'Published Scientific Research'), ('prototype', 'Prototype'), ('science_communication', 'Science Translation and Simplification')], max_length=30, verbose_name='Project Category')),
+                ('accept_terms', models.BooleanField(default=False, verbose_name='Accept Terms')),
+                ('registration_date', models.DateTimeField(verbose_name='Registration Date')),
+                ('updated_at', models.DateTimeField(verbose_name='Last Updated')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archived At')),
+            ],
+            options={
+                'verbose_name': 'Archived Registration',
+                'verbose_name_plural': 'Archived Registrations',
+                'ordering': ['-registration_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTeamMember',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, verbose_name='Student Name')),
+                ('level', models.CharField(choices=[('bachelor', 'Bachelor'), ('master', 'Graduate Studies (Master)'), ('phd', 'Graduate Studies (PhD)')], max_length=20, verbose_name='Academic Level')),
+                ('order', models.IntegerField(default=1, verbose_name='Member Order')),
+            ],
+            options={
+                'verbose_name': 'Archived Team Member',
+                'verbose_name_plural': 'Archived Team Members',
+                'ordering': ['order'],
+            },
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='season',
+            field=models.PositiveSmallIntegerField(default=registrations.models.current_season, verbose_name='Season'),
+        ),
+        migrations.AlterField(
+            model_name='registration',
+            name='team_leader_email',
+            field=models.EmailField(max_length=254, verbose_name='Team Leader Email'),
+        ),
+        migrations.AddConstraint(
+            model_name='registration',
+            constraint=models.UniqueConstraint(fields=('season', 'team_leader_email'), name='registration_season_email_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedregistration',
+            index=models.Index(fields=['season', '-registration_date'], name='archived_reg_season_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedteammember',
+            name='registration',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='members', to='registrations.archivedregistration', verbose_name='Team Registration'),
+        ),
+        # Last, so no schema change follows the data update in this transaction
+        migrations.RunPython(backfill_season, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:38
+
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 2000
+
+
+def normalize_name(name):
+    # Frozen copy of registrations.models.normalize_name
+    decomposed = unicodedata.normalize('NFKD', name or '').casefold()
+    return ''.join(char for char in decomposed if char.isalnum())
+
+
+def backfill_name_key(apps, schema_editor):
+    """Compute the key for existing members, in batches of primary-key
+    UPDATEs (bulk_update's CASE expressions grow quadratically)"""
+    TeamMember = apps.get_model('registrations', 'TeamMember')
+    members = TeamMember.objects.using(schema_editor.connection.alias).order_by().values_list('id', 'name')
+    sql = f'UPDATE {TeamMember._meta.db_table} SET name_key = %s WHERE id = %s'
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for member_id, name in members.iterator(chunk_size=BATCH_SIZE):
+            batch.append((normalize_name(name), member_id))
+            if len(batch) == BATCH_SIZE:
+                cursor.executemany(sql, batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0008_season_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teammember',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=200, verbose_name='Name Key'),
+        ),
+        # Fill the column before indexing it, so the index is built once
+        migrations.RunPython(backfill_name_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['name_key', 'registration'], name='teammember_name_key_idx'),
+        ),
+    ]
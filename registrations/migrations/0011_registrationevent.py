@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:45
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0010_outboxemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('updated', 'Updated'), ('deleted', 'Deleted')], max_length=10, verbose_name='Kind')),
+                ('registration_id', models.PositiveIntegerField(verbose_name='Registration ID')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Payload')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Registration Event',
+                'verbose_name_plural': 'Registration Events',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:55
+
+import registrations.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0011_registrationevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacityQuota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField(default=registrations.models.current_season, verbose_name='Season')),
+                ('dimension', models.CharField(choices=[('project_field', 'Project Field'), ('project_category', 'Project Category')], max_length=20, verbose_name='Applies To')),
+                ('value', models.CharField(max_length=30, verbose_name='Field or Category')),
+                ('limit', models.PositiveIntegerField(verbose_name='Maximum Teams')),
+                ('used', models.PositiveIntegerField(default=0, editable=False, verbose_name='Teams Registered')),
+            ],
+            options={
+                'verbose_name': 'Capacity Quota',
+                'verbose_name_plural': 'Capacity Quotas',
+                'ordering': ['-season', 'dimension', 'value'],
+                'constraints': [models.UniqueConstraint(fields=('season', 'dimension', 'value'), name='quota_season_dimension_value_uniq')],
+            },
+        ),
+    ]
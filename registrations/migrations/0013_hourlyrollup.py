@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0012_capacityquota'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(verbose_name='Hour')),
+                ('project_field', models.CharField(choices=[('health', 'Health'), ('energy', 'Energy'), ('environment', 'Environment')], max_length=20, verbose_name='Project Field')),
+                ('project_category', models.CharField(choices=[('student_research', 'Student Research Project'), ('published_research', 'Published Scientific Research'), ('prototype', 'Prototype'), ('science_communication', 'Science Translation and Simplification')], max_length=30, verbose_name='Project Category')),
+                ('teams', models.PositiveIntegerField(default=0, verbose_name='Teams')),
+            ],
+            options={
+                'verbose_name': 'Hourly Rollup',
+                'verbose_name_plural': 'Hourly Rollups',
+                'ordering': ['hour'],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'project_field', 'project_category'), name='rollup_hour_field_category_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0014_archived_bigint_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='registrationevent',
+            name='registration_id',
+            field=models.BigIntegerField(verbose_name='Registration ID'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0015_registrationevent_bigint_registration_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrationevent',
+            name='transaction_id',
+            field=models.BigIntegerField(default=0, verbose_name='Transaction ID'),
+        ),
+        migrations.AddIndex(
+            model_name='registrationevent',
+            index=models.Index(fields=['transaction_id', 'id'], name='event_transaction_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0016_registrationevent_transaction_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': 'Registrations Version',
+                'verbose_name_plural': 'Registrations Version',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['updated_at'], name='reg_updated_idx'),
+        ),
+    ]
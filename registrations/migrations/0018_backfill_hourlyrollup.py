@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def backfill_rollup(apps, schema_editor):
+    """Count the teams registered before the rollup existed"""
+    from registrations.rollup import rollup_buckets
+
+    Registration = apps.get_model('registrations', 'Registration')
+    HourlyRollup = apps.get_model('registrations', 'HourlyRollup')
+    db_alias = schema_editor.connection.alias
+    HourlyRollup.objects.using(db_alias).all().delete()
+    HourlyRollup.objects.using(db_alias).bulk_create(
+        [HourlyRollup(**values) for values in rollup_buckets(Registration.objects.using(db_alias))],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registrations', '0017_registrationversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,49 @@
+import hashlib
+import unicodedata
+import uuid
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import validate_email
 
+def current_season():
+    """The competition edition new registrations belong to"""
+    return settings.CURRENT_SEASON
+
+def normalize_name(name):
+    """Matching key for a person's name: case-folded, accents stripped and
+    everything but letters and digits removed, so "Jean-Luc  O'Brien" and
+    "jean luc obrien" share a key"""
+    decomposed = unicodedata.normalize('NFKD', name or '').casefold()
+    return ''.join(char for char in decomposed if char.isalnum())
+
+class TeamMemberQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, reindex=True, **kwargs):
+        """Insert members in one statement, then re-index their teams,
+        report them on the change feed and bump the registrations version,
+        since bulk inserts skip the post_save signal. Callers that insert
+        the teams themselves in the same transaction (bulk loaders that
+        rebuild the whole index afterwards, Registration.create_team) pass
+        reindex=False."""
+        from .events import record_changes
+        from .search import refresh_search_index
+        from .versions import bump_version
+        
+        objs = list(objs)
+        for member in objs:
+            member.name_key = normalize_name(member.name)
+        created = super().bulk_create(objs, *args, **kwargs)
+        if reindex:
+            registration_ids = {member.registration_id for member in created}
+            refresh_search_index(registration_ids, using=self.db)
+            record_changes(RegistrationEvent.KIND_UPDATED, registration_ids, using=self.db)
+            bump_version(self.db)
+        return created
+
 class TeamMember(models.Model):
     """Model for individual team members"""
     LEVEL_CHOICES = [
@@ -10,17 +52,52 @@ class TeamMember(models.Model):
         ('phd', 'Graduate Studies (PhD)'),
     ]
     
+    # Nullable only for legacy members that were orphaned under the old many-to-many
+    registration = models.ForeignKey(
+        'Registration',
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='members',
+        verbose_name="Team Registration"
+    )
     name = models.CharField(max_length=200, verbose_name="Student Name")
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES, verbose_name="Academic Level")
     order = models.IntegerField(verbose_name="Member Order", default=1)
+    # normalize_name(name), kept in sync on save and bulk_create; used to
+    # find the same student on several teams
+    name_key = models.CharField(max_length=200, default='', editable=False, verbose_name="Name Key")
+    
+    objects = TeamMemberQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.name} ({self.get_level_display()})"
     
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+    
     class Meta:
         verbose_name = "Team Member"
         verbose_name_plural = "Team Members"
         ordering = ['order']
+        indexes = [
+            models.Index(fields=['registration', 'order'], name='teammember_registration_order'),
+            # Covers the duplicate report's GROUP BY name_key / COUNT(DISTINCT registration)
+            models.Index(fields=['name_key', 'registration'], name='teammember_name_key_idx'),
+        ]
+
+class RegistrationQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Insert registrations in one statement and bump the registrations
+        version, which the skipped post_save signal would have done"""
+        from .versions import bump_version
+        
+        created = super().bulk_create(objs, *args, **kwargs)
+        bump_version(self.db)
+        return created
 
 class Registration(models.Model):
     """Model for team registrations"""
@@ -37,7 +114,9 @@ class Registration(models.Model):
         ('science_communication', 'Science Translation and Simplification'),
     ]
     
-    team_leader_email = models.EmailField(verbose_name="Team Leader Email", unique=True)
+    # Unique per season (see Meta.constraints) so leaders can enter again next year
+    team_leader_email = models.EmailField(verbose_name="Team Leader Email")
+    season = models.PositiveSmallIntegerField(default=current_season, verbose_name="Season")
     project_field = models.CharField(
         max_length=20, 
         choices=PROJECT_FIELD_CHOICES, 
@@ -52,8 +131,7 @@ class Registration(models.Model):
     registration_date = models.DateTimeField(auto_now_add=True, verbose_name="Registration Date")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Last Updated")
     
-    # Related team members
-    members = models.ManyToManyField(TeamMember, related_name='registrations', verbose_name="Team Members")
+    objects = RegistrationQuerySet.as_manager()
     
     def __str__(self):
         return f"Team {self.team_leader_email}"
@@ -67,6 +145,63 @@ class Registration(models.Model):
         verbose_name = "Team Registration"
         verbose_name_plural = "Team Registrations"
         ordering = ['-registration_date']
+        # One index per dashboard/export filter combination, each ending in
+        # the default ordering so filtered pages are read in index order
+        indexes = [
+            models.Index(fields=['-registration_date'], name='reg_date_idx'),
+            models.Index(fields=['project_field', '-registration_date'], name='reg_field_date_idx'),
+            models.Index(fields=['project_category', '-registration_date'], name='reg_category_date_idx'),
+            models.Index(fields=['project_field', 'project_category', '-registration_date'], name='reg_field_cat_date_idx'),
+            # Rows changed since the dashboard snapshot last looked
+            models.Index(fields=['updated_at'], name='reg_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'team_leader_email'], name='registration_season_email_uniq'),
+        ]
+    
+    # Cache lifetime of a taken address; see email_exists()
+    EMAIL_CACHE_TTL = 60
+    
+    @staticmethod
+    def email_cache_key(email, season=None):
+        season = season or current_season()
+        return f'registrations:email:{season}:' + hashlib.md5(email.encode()).hexdigest()
+    
+    @classmethod
+    def email_exists(cls, email):
+        """Whether `email` is already registered this season. Only taken
+        addresses are cached: a free answer cached in one worker would go on
+        saying "available" after another worker registered the address,
+        since invalidation only reaches the writing worker's cache"""
+        season = current_season()
+        key = cls.email_cache_key(email, season)
+        if cache.get(key):
+            return True
+        exists = cls.objects.filter(season=season, team_leader_email=email).exists()
+        if exists:
+            cache.set(key, True, cls.EMAIL_CACHE_TTL)
+        return exists
+    
+    @classmethod
+    def create_team(cls, members, **fields):
+        """Create a registration and its members (unsaved TeamMember
+        instances) as one team. The search index is refreshed and a single
+        'created' event carrying the members is recorded once both are
+        saved, instead of a memberless 'created' plus an 'updated'. Call
+        inside a transaction."""
+        from .events import record_created
+        from .search import refresh_search_index
+        
+        registration = cls(**fields)
+        # Tells the post_save handler the team is completed here
+        registration._team_pending = True
+        registration.save()
+        for member in members:
+            member.registration = registration
+        TeamMember.objects.bulk_create(members, reindex=False)
+        refresh_search_index([registration.pk])
+        record_created(registration, members)
+        return registration
     
     @classmethod
     def export_to_csv(cls):
@@ -89,16 +224,17 @@ class Registration(models.Model):
             'Registration Date'
         ])
         
-        # Write data
-        for registration in cls.objects.all():
-            leader = registration.members.filter(order=1).first()
-            all_members = ', '.join([f"{member.name} ({member.get_level_display()})" for member in registration.members.all()])
+        # Write data; members come from one prefetch query, already in order
+        for registration in cls.objects.prefetch_related('members'):
+            members = list(registration.members.all())
+            leader = next((member for member in members if member.order == 1), None)
+            all_members = ', '.join([f"{member.name} ({member.get_level_display()})" for member in members])
             
             writer.writerow([
                 registration.team_leader_email,
                 leader.name if leader else '',
                 leader.get_level_display() if leader else '',
-                registration.get_members_count(),
+                len(members),
                 all_members,
                 registration.get_project_field_display(),
                 registration.get_project_category_display(),
@@ -106,4 +242,258 @@ class Registration(models.Model):
             ])
         
         output.seek(0)
-        return output.getvalue()
\ No newline at end of file
+        return output.getvalue()
+
+class ExportJob(models.Model):
+    """A CSV export generated in the background into the export spool directory"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    # Random ids so download URLs cannot be enumerated
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Identifies the data snapshot and filters; repeat requests reuse the job
+    snapshot_key = models.CharField(max_length=64, unique=True, verbose_name="Snapshot Key")
+    params = models.TextField(blank=True, verbose_name="Filter Parameters")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Status")
+    total_rows = models.PositiveIntegerField(default=0, verbose_name="Total Rows")
+    rows_written = models.PositiveIntegerField(default=0, verbose_name="Rows Written")
+    file_name = models.CharField(max_length=100, blank=True, verbose_name="File Name")
+    error = models.TextField(blank=True, verbose_name="Error")
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, verbose_name="Created By")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Last Updated")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Finished At")
+    
+    def __str__(self):
+        return f"Export {self.id} ({self.status})"
+    
+    @property
+    def progress(self):
+        """Completion percentage"""
+        if self.status == self.STATUS_DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.rows_written * 100 / self.total_rows))
+    
+    class Meta:
+        verbose_name = "Export Job"
+        verbose_name_plural = "Export Jobs"
+        ordering = ['-created_at']
+
+class ArchivedRegistration(models.Model):
+    """A registration from a closed season, moved out of the live table by
+    the archive_season command; ids are kept from the live table"""
+    id = models.BigIntegerField(primary_key=True)
+    team_leader_email = models.EmailField(verbose_name="Team Leader Email")
+    season = models.PositiveSmallIntegerField(verbose_name="Season")
+    project_field = models.CharField(max_length=20, choices=Registration.PROJECT_FIELD_CHOICES, verbose_name="Project Field")
+    project_category = models.CharField(max_length=30, choices=Registration.PROJECT_CATEGORY_CHOICES, verbose_name="Project Category")
+    accept_terms = models.BooleanField(default=False, verbose_name="Accept Terms")
+    registration_date = models.DateTimeField(verbose_name="Registration Date")
+    updated_at = models.DateTimeField(verbose_name="Last Updated")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Archived At")
+    
+    def __str__(self):
+        return f"Team {self.team_leader_email} ({self.season})"
+    
+    class Meta:
+        verbose_name = "Archived Registration"
+        verbose_name_plural = "Archived Registrations"
+        ordering = ['-registration_date']
+        indexes = [
+            models.Index(fields=['season', '-registration_date'], name='archived_reg_season_date_idx'),
+        ]
+
+class ArchivedTeamMember(models.Model):
+    """A member of an archived registration"""
+    id = models.BigIntegerField(primary_key=True)
+    registration = models.ForeignKey(
+        ArchivedRegistration,
+        on_delete=models.CASCADE,
+        related_name='members',
+        verbose_name="Team Registration"
+    )
+    name = models.CharField(max_length=200, verbose_name="Student Name")
+    level = models.CharField(max_length=20, choices=TeamMember.LEVEL_CHOICES, verbose_name="Academic Level")
+    order = models.IntegerField(verbose_name="Member Order", default=1)
+    
+    def __str__(self):
+        return f"{self.name} ({self.get_level_display()})"
+    
+    class Meta:
+        verbose_name = "Archived Team Member"
+        verbose_name_plural = "Archived Team Members"
+        ordering = ['order']
+
+class OutboxEmail(models.Model):
+    """An email written in the same transaction as the change it reports and
+    delivered later by the send_outbox command; see registrations.outbox"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    
+    registration = models.ForeignKey(
+        Registration,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='emails',
+        verbose_name="Registration"
+    )
+    to_email = models.EmailField(verbose_name="To")
+    subject = models.CharField(max_length=200, verbose_name="Subject")
+    body = models.TextField(verbose_name="Body")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Status")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Attempts")
+    # Not sent before this time: set by retry backoff and by a worker's claim
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Next Attempt")
+    last_error = models.TextField(blank=True, verbose_name="Last Error")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Sent At")
+    
+    def __str__(self):
+        return f"{self.subject} to {self.to_email} ({self.status})"
+    
+    class Meta:
+        verbose_name = "Outbox Email"
+        verbose_name_plural = "Outbox Emails"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+class RegistrationEvent(models.Model):
+    """Append-only change feed entry for a team; see registrations.events"""
+    KIND_CREATED = 'created'
+    KIND_UPDATED = 'updated'
+    KIND_DELETED = 'deleted'
+    
+    KIND_CHOICES = [
+        (KIND_CREATED, 'Created'),
+        (KIND_UPDATED, 'Updated'),
+        (KIND_DELETED, 'Deleted'),
+    ]
+    
+    # The id is the consumers' cursor, so it must keep growing
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="Kind")
+    # Not a foreign key: events outlive the team they describe
+    registration_id = models.BigIntegerField(verbose_name="Registration ID")
+    payload = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Payload")
+    # Writing transaction's id on PostgreSQL, 0 on SQLite; events are served
+    # in (transaction_id, id) order, see registrations.events
+    transaction_id = models.BigIntegerField(default=0, verbose_name="Transaction ID")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    
+    def __str__(self):
+        return f"#{self.pk} {self.kind} registration {self.registration_id}"
+    
+    def as_dict(self):
+        return {
+            'id': self.pk,
+            'kind': self.kind,
+            'registration_id': self.registration_id,
+            'payload': self.payload,
+            'created_at': self.created_at.isoformat(),
+        }
+    
+    class Meta:
+        verbose_name = "Registration Event"
+        verbose_name_plural = "Registration Events"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['transaction_id', 'id'], name='event_transaction_idx'),
+        ]
+
+class CapacityQuota(models.Model):
+    """Cap on the teams a season accepts in one project field or category.
+    `used` is counted from the table when the quota is created or moved, then
+    kept up to date by the registration signals; see registrations.quotas"""
+    DIMENSION_CHOICES = [
+        ('project_field', 'Project Field'),
+        ('project_category', 'Project Category'),
+    ]
+    
+    season = models.PositiveSmallIntegerField(default=current_season, verbose_name="Season")
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES, verbose_name="Applies To")
+    value = models.CharField(max_length=30, verbose_name="Field or Category")
+    limit = models.PositiveIntegerField(verbose_name="Maximum Teams")
+    used = models.PositiveIntegerField(default=0, editable=False, verbose_name="Teams Registered")
+    
+    def __str__(self):
+        return f"{self.get_value_display()} ({self.season}): {self.used}/{self.limit}"
+    
+    def get_value_display(self):
+        choices = dict(Registration.PROJECT_FIELD_CHOICES + Registration.PROJECT_CATEGORY_CHOICES)
+        return choices.get(self.value, self.value)
+    
+    def remaining(self):
+        return max(self.limit - self.used, 0)
+    
+    def save(self, *args, **kwargs):
+        # `used` moves by F() updates from concurrent registrations; editing
+        # the limit must not write back the copy loaded with the form
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = ['season', 'dimension', 'value', 'limit']
+        super().save(*args, **kwargs)
+    
+    def clean(self):
+        choices = Registration.PROJECT_FIELD_CHOICES if self.dimension == 'project_field' else Registration.PROJECT_CATEGORY_CHOICES
+        if self.value not in dict(choices):
+            raise ValidationError({'value': f'Not a valid {self.get_dimension_display().lower()}'})
+    
+    class Meta:
+        verbose_name = "Capacity Quota"
+        verbose_name_plural = "Capacity Quotas"
+        ordering = ['-season', 'dimension', 'value']
+        constraints = [
+            models.UniqueConstraint(fields=['season', 'dimension', 'value'], name='quota_season_dimension_value_uniq'),
+        ]
+
+class HourlyRollup(models.Model):
+    """Teams registered per UTC hour, field and category, kept up to date by
+    the registration signals; see registrations.rollup"""
+    hour = models.DateTimeField(verbose_name="Hour")
+    project_field = models.CharField(max_length=20, choices=Registration.PROJECT_FIELD_CHOICES, verbose_name="Project Field")
+    project_category = models.CharField(max_length=30, choices=Registration.PROJECT_CATEGORY_CHOICES, verbose_name="Project Category")
+    teams = models.PositiveIntegerField(default=0, verbose_name="Teams")
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.project_field}/{self.project_category}: {self.teams}"
+    
+    class Meta:
+        verbose_name = "Hourly Rollup"
+        verbose_name_plural = "Hourly Rollups"
+        ordering = ['hour']
+        constraints = [
+            # Also the index the time-series endpoint reads by hour range
+            models.UniqueConstraint(fields=['hour', 'project_field', 'project_category'], name='rollup_hour_field_category_uniq'),
+        ]
+
+class RegistrationVersion(models.Model):
+    """Single row counting the writes to the live team tables, so copies of
+    them can tell cheaply whether they are stale; see registrations.versions"""
+    version = models.BigIntegerField(default=0, verbose_name="Version")
+    
+    def __str__(self):
+        return f"Registrations version {self.version}"
+    
+    class Meta:
+        verbose_name = "Registrations Version"
+        verbose_name_plural = "Registrations Version"
@@ -0,0 +1,110 @@
+"""
+Transactional outbox for emails.
+
+queue_confirmation() writes an OutboxEmail row inside the registration's
+transaction, so a confirmation is queued exactly when the team is saved and
+the request never waits on SMTP. The send_outbox command calls
+send_pending(), which claims a batch of due emails, delivers them over one
+reused mail connection and schedules failures for a retry with exponential
+backoff, giving up after settings.OUTBOX_MAX_ATTEMPTS.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 100
+
+# A claimed email is not handed to another worker for this long, so a
+# worker that dies mid-batch only delays its emails
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+def queue_confirmation(registration, members):
+    """Queue the confirmation email for a new registration; call inside the
+    transaction that creates it"""
+    context = {'registration': registration, 'members': members}
+    return OutboxEmail.objects.create(
+        registration=registration,
+        to_email=registration.team_leader_email,
+        subject=render_to_string('registrations/emails/confirmation_subject.txt', context).strip(),
+        body=render_to_string('registrations/emails/confirmation.txt', context),
+    )
+
+
+def retry_delay(attempts):
+    """Backoff before the next try after `attempts` failed deliveries"""
+    return timedelta(seconds=min(
+        settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.OUTBOX_RETRY_MAX_SECONDS,
+    ))
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """Due emails for this worker; other workers skip them until the claim expires"""
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(next_attempt_at=now + CLAIM_TIMEOUT)
+    return emails
+
+
+def _record_failure(email, error):
+    attempts = email.attempts + 1
+    if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        logger.error('Outbox email gave up', extra={'outbox_id': email.pk, 'attempts': attempts})
+        changes = {'status': OutboxEmail.STATUS_FAILED}
+    else:
+        changes = {'next_attempt_at': timezone.now() + retry_delay(attempts)}
+    OutboxEmail.objects.filter(pk=email.pk).update(attempts=F('attempts') + 1, last_error=error, **changes)
+
+
+def send_pending(batch_size=OUTBOX_BATCH_SIZE):
+    """Deliver one batch of due emails; returns (sent, failed)"""
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent_ids = []
+    failed = 0
+    connection = get_connection()
+    try:
+        # Opened once here, so send_messages() reuses it for the whole batch
+        connection.open()
+    except Exception as e:
+        logger.warning('Mail connection failed', extra={'error': str(e)})
+        for email in emails:
+            _record_failure(email, f'Connection failed: {e}')
+        return 0, len(emails)
+    try:
+        for email in emails:
+            message = EmailMessage(email.subject, email.body, settings.DEFAULT_FROM_EMAIL, [email.to_email])
+            try:
+                # One message per call so a rejected address fails only its own email
+                connection.send_messages([message])
+            except Exception as e:
+                failed += 1
+                _record_failure(email, str(e))
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        connection.close()
+
+    OutboxEmail.objects.filter(pk__in=sent_ids).update(
+        status=OutboxEmail.STATUS_SENT, attempts=F('attempts') + 1, sent_at=timezone.now(), last_error=''
+    )
+    return len(sent_ids), failed
@@ -0,0 +1,73 @@
+"""
+Row counting for paginated listings on large tables.
+
+Below settings.APPROXIMATE_COUNT_THRESHOLD rows counts are exact. Above it,
+PostgreSQL answers from planner statistics instead of running COUNT(*):
+pg_class.reltuples for a whole table and the EXPLAIN row estimate for a
+filtered queryset. Other databases always count exactly.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimate_row_count(model, using='default'):
+    """PostgreSQL planner estimate of a table's row count, or None if unavailable"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+def estimate_queryset_count(queryset):
+    """PostgreSQL EXPLAIN estimate of how many rows `queryset` returns, or None"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_rows(queryset):
+    """Count `queryset`, returning (count, is_estimate)"""
+    if queryset.query.where:
+        estimate = estimate_queryset_count(queryset)
+    else:
+        estimate = estimate_row_count(queryset.model, using=queryset.db)
+    if estimate is not None and estimate >= settings.APPROXIMATE_COUNT_THRESHOLD:
+        return estimate, True
+    return queryset.count(), False
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose total comes from count_rows, so pages of a large
+    table never trigger a full COUNT(*); `count_is_estimate` tells
+    templates whether to show the total as approximate"""
+    
+    count_is_estimate = False
+    
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        count, self.count_is_estimate = count_rows(self.object_list)
+        return count
@@ -0,0 +1,154 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries a valid signed X-Profile-Token header
+(see the make_profile_token command) or when a staff user adds ?_profile=1 to
+the URL; ?_profile=mem additionally traces memory allocations. The view runs
+under cProfile and the report is written to settings.PROFILER_DIR as a pstats
+dump, a text summary and a JSON metadata file listed on the staff profiles page.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+PROFILE_PARAM = '_profile'
+TOKEN_SALT = 'registrations.profiling'
+
+# Functions and allocation sites shown in the text summary
+SUMMARY_LIMIT = 40
+
+
+def make_token():
+    """Signed value for the X-Profile-Token header"""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def _token_is_valid(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profile_mode(request):
+    """None if the request should not be profiled, else 'cpu' or 'mem'"""
+    flag = request.GET.get(PROFILE_PARAM)
+    token = request.META.get(PROFILE_HEADER)
+    if token and _token_is_valid(token):
+        return 'mem' if flag == 'mem' else 'cpu'
+    user = getattr(request, 'user', None)
+    if flag and user is not None and user.is_staff:
+        return 'mem' if flag == 'mem' else 'cpu'
+    return None
+
+
+def profiles_dir():
+    return Path(settings.PROFILER_DIR)
+
+
+def list_profiles(limit=50):
+    """Metadata of the most recent profiles, newest first"""
+    directory = profiles_dir()
+    if not directory.exists():
+        return []
+    paths = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+    profiles = []
+    for path in paths[:limit]:
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_file(name, suffix):
+    """Path of a report file, or None if `name` is not a profile id"""
+    try:
+        uuid.UUID(name)
+    except ValueError:
+        return None
+    path = profiles_dir() / f'{name}{suffix}'
+    return path if path.exists() else None
+
+
+def _prune(directory):
+    """Keep only the newest settings.PROFILER_KEEP reports"""
+    reports = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for stale in reports[settings.PROFILER_KEEP:]:
+        for suffix in ('.json', '.prof', '.txt'):
+            stale.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def _write_report(request, response, profiler, duration, snapshot):
+    directory = profiles_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    name = uuid.uuid4().hex
+    profiler.dump_stats(directory / f'{name}.prof')
+
+    summary = io.StringIO()
+    stats = pstats.Stats(profiler, stream=summary)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_LIMIT)
+    if snapshot is not None:
+        summary.write('\nTop memory allocations by line:\n')
+        for stat in snapshot.statistics('lineno')[:SUMMARY_LIMIT]:
+            summary.write(f'{stat}\n')
+    (directory / f'{name}.txt').write_text(summary.getvalue())
+
+    match = getattr(request, 'resolver_match', None)
+    metadata = {
+        'id': name,
+        'created': timezone.now().isoformat(),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'view': match.view_name if match else '',
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 1),
+        'mode': 'mem' if snapshot is not None else 'cpu',
+    }
+    (directory / f'{name}.json').write_text(json.dumps(metadata))
+    _prune(directory)
+    return name
+
+
+class ProfilingMiddleware:
+    """Run opted-in requests under cProfile (and tracemalloc) and save the report.
+
+    Placed last in MIDDLEWARE so the profile covers the view and its
+    template rendering but not the other middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = profile_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        trace_memory = mode == 'mem' and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            response = profiler.runcall(self.get_response, request)
+        finally:
+            duration = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot() if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+
+        response['X-Profile-Id'] = _write_report(request, response, profiler, duration, snapshot)
+        return response
@@ -0,0 +1,108 @@
+"""
+Bulk removal of team data without the ORM delete collector.
+
+QuerySet.delete() loads every row to send per-row signals, which re-index
+and touch each team; for whole-table or orphan cleanup that is pure
+overhead. These helpers delete with plain SQL in batches (or TRUNCATE on
+PostgreSQL, when no other table references the team tables) and then fix
+up the derived data once. A purge still appends a 'deleted' event per team
+to the change feed, marked "purged", in the transaction that removes it.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from .cache import invalidate
+from .events import record_deletions
+from .models import CapacityQuota, HourlyRollup, OutboxEmail, Registration, RegistrationEvent, TeamMember
+from .quotas import quota_cache_key
+from .search import rebuild_search_index
+from .versions import bump_version
+
+PURGE_BATCH_SIZE = 5000
+
+
+def delete_rows(using, model, column, ids):
+    """DELETE rows of `model` whose `column` is in `ids`, skipping signals"""
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {model._meta.db_table} WHERE {column} IN ({placeholders})', ids)
+        return cursor.rowcount
+
+
+def collect_orphan_members(batch_size=PURGE_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """Delete members without a team (left over from the many-to-many era)
+    one batch per transaction, yielding the running total removed"""
+    orphans = TeamMember.objects.using(using).filter(registration__isnull=True).order_by('pk')
+    removed = 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(orphans.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            removed += delete_rows(using, TeamMember, 'id', ids)
+        yield removed
+
+
+def truncate_tables():
+    """The live team tables for a single TRUNCATE, or None when a table
+    outside them has a foreign key into them: PostgreSQL refuses to truncate
+    a referenced table even when no row points at it"""
+    live = [TeamMember, Registration]
+    for model in live:
+        for relation in model._meta.related_objects:
+            if relation.related_model not in live and relation.field.db_constraint:
+                return None
+    return [model._meta.db_table for model in live]
+
+
+def purge_registrations(batch_size=PURGE_BATCH_SIZE, using=DEFAULT_DB_ALIAS):
+    """Remove every live registration and team member; returns
+    (registrations, members) removed. Archived seasons are kept."""
+    connection = connections[using]
+    registrations = Registration.objects.using(using).count()
+    members = TeamMember.objects.using(using).count()
+    seasons = list(Registration.objects.using(using).order_by().values_list('season', flat=True).distinct())
+    # Queued emails outlive their team and are still delivered
+    OutboxEmail.objects.using(using).filter(registration__isnull=False).update(registration=None)
+
+    tables = truncate_tables()
+    if connection.vendor == 'postgresql' and tables:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            # The deletion events are written by the database, without
+            # loading the teams, in the transaction of the TRUNCATE
+            cursor.execute(
+                f'INSERT INTO {RegistrationEvent._meta.db_table} '
+                '(kind, registration_id, payload, transaction_id, created_at) '
+                "SELECT %s, id, jsonb_build_object('id', id, 'team_leader_email', team_leader_email, "
+                "'season', season, 'purged', true), txid_current(), now() "
+                f'FROM {Registration._meta.db_table} ORDER BY id',
+                [RegistrationEvent.KIND_DELETED]
+            )
+            # Sequences are not restarted: archived rows keep their old ids
+            cursor.execute(f'TRUNCATE {", ".join(tables)}')
+            bump_version(using)
+    else:
+        # Also PostgreSQL while OutboxEmail references Registration: its
+        # queued emails are kept, so its table cannot join the TRUNCATE
+        teams = Registration.objects.using(using).order_by('pk').values('id', 'team_leader_email', 'season')
+        while True:
+            # Short transactions keep the write lock brief on SQLite
+            with transaction.atomic(using=using):
+                rows = list(teams[:batch_size])
+                if not rows:
+                    break
+                ids = [row['id'] for row in rows]
+                record_deletions(rows, using, purged=True)
+                delete_rows(using, TeamMember, 'registration_id', ids)
+                delete_rows(using, Registration, 'id', ids)
+                bump_version(using)
+        # Members left without a team
+        for _ in collect_orphan_members(batch_size, using):
+            pass
+        rebuild_search_index(using=using)
+
+    # The signals that release quota places and hourly buckets were skipped
+    CapacityQuota.objects.using(using).filter(season__in=seasons).update(used=0)
+    HourlyRollup.objects.using(using).all().delete()
+    invalidate(*[quota_cache_key(season) for season in seasons])
+    return registrations, members
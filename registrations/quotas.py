@@ -0,0 +1,143 @@
+"""
+Per-season capacity quotas on project fields and categories.
+
+Each CapacityQuota row holds a limit and a `used` counter. Counters move by
+F() updates from the registration signals, in the same transaction as the
+team they count, so no submission ever aggregates the registration table.
+
+A submission is checked twice. First against the cached remaining capacity
+(also shown on the form), which turns away teams for full quotas without a
+transaction. Then reserve_places() locks the team's quota rows with
+SELECT ... FOR UPDATE inside the registration transaction and refuses the
+team if one is full; concurrent submissions for the same field or category
+queue on the lock, so a quota is never overfilled. The cache only serves the
+pre-check and the form: locking and counting always go to the table, since
+a quota created in another worker is not in this worker's cache yet. Staff
+edits in the admin are counted but not refused.
+
+A quota added during a campaign, or moved to another season, field or
+category, starts from the teams already registered: recount_quota() counts
+them while holding the quota's row lock.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Q
+
+from .cache import get_or_compute, invalidate
+from .models import CapacityQuota, Registration, current_season
+
+# Remaining capacity shown on the form may lag by this many seconds; the
+# transaction check is always exact
+QUOTA_CACHE_TTL = 30
+
+
+class QuotaFull(Exception):
+    def __init__(self, dimension, value):
+        self.dimension = dimension
+        self.value = value
+        label = dict(Registration.PROJECT_FIELD_CHOICES + Registration.PROJECT_CATEGORY_CHOICES).get(value, value)
+        kind = 'project field' if dimension == 'project_field' else 'project category'
+        super().__init__(f'The {label} {kind} is full for this season')
+
+
+def quota_cache_key(season):
+    return f'registrations:quotas:{season}'
+
+
+def quota_usage(season=None):
+    """{(dimension, value): (limit, used)} for the season's quotas, cached"""
+    season = season or current_season()
+    return get_or_compute(
+        quota_cache_key(season),
+        lambda: {
+            (dimension, value): (limit, used)
+            for dimension, value, limit, used in CapacityQuota.objects.filter(season=season)
+            .values_list('dimension', 'value', 'limit', 'used')
+        },
+        ttl=QUOTA_CACHE_TTL
+    )
+
+
+def remaining_capacity(dimension, value, season=None):
+    """Places left for `value` of `dimension`, or None when it is not capped"""
+    usage = quota_usage(season).get((dimension, value))
+    if usage is None:
+        return None
+    limit, used = usage
+    return max(limit - used, 0)
+
+
+def _team_quotas(project_field, project_category):
+    return [('project_field', project_field), ('project_category', project_category)]
+
+
+def _team_condition(project_field, project_category):
+    condition = Q()
+    for dimension, value in _team_quotas(project_field, project_category):
+        condition |= Q(dimension=dimension, value=value)
+    return condition
+
+
+def full_quota(project_field, project_category, season=None):
+    """The first full (dimension, value) for such a team per the cached
+    counters, or None; a cheap pre-check before the transaction"""
+    for dimension, value in _team_quotas(project_field, project_category):
+        if remaining_capacity(dimension, value, season) == 0:
+            return dimension, value
+    return None
+
+
+def reserve_places(project_field, project_category, season=None, using=DEFAULT_DB_ALIAS):
+    """Lock the quotas a new team counts against and raise QuotaFull if one
+    has no places left. Call inside the transaction that creates the team;
+    the locks are held until it commits, when the team's post_save has
+    counted it. Reads the table, not the cached counters, so a quota just
+    created in another worker is enforced too."""
+    season = season or current_season()
+    # Locked in primary key order so two submissions cannot deadlock
+    quotas = (
+        CapacityQuota.objects.using(using).select_for_update()
+        .filter(_team_condition(project_field, project_category), season=season).order_by('pk')
+    )
+    for quota in quotas:
+        if quota.used >= quota.limit:
+            raise QuotaFull(quota.dimension, quota.value)
+
+
+def count_places(season, project_field, project_category, delta, using=DEFAULT_DB_ALIAS):
+    """Add `delta` teams to the season's quotas for this field and category.
+    Always updates the table: skipping it on the cached counters would miss
+    quotas created in another worker within the cache lifetime."""
+    quotas = CapacityQuota.objects.using(using).filter(_team_condition(project_field, project_category), season=season)
+    if delta < 0:
+        quotas = quotas.filter(used__gte=-delta)
+    if quotas.update(used=F('used') + delta):
+        invalidate(quota_cache_key(season))
+
+
+def _registered(quota, using):
+    return Registration.objects.using(using).filter(season=quota.season, **{quota.dimension: quota.value}).count()
+
+
+def recount_quota(quota, using=DEFAULT_DB_ALIAS):
+    """Set one quota's counter from the registration table, for a quota just
+    created or moved to another season, field or category"""
+    with transaction.atomic(using=using):
+        # Locked before counting: teams submitted meanwhile wait in
+        # reserve_places() and are counted on top of the result
+        CapacityQuota.objects.using(using).select_for_update().get(pk=quota.pk)
+        quota.used = _registered(quota, using)
+        CapacityQuota.objects.using(using).filter(pk=quota.pk).update(used=quota.used)
+    invalidate(quota_cache_key(quota.season))
+
+
+def recount_quotas(season=None, using=DEFAULT_DB_ALIAS):
+    """Reset the season's counters from the registration table, after bulk
+    loads or deletes that bypass the signals; returns the quotas updated"""
+    season = season or current_season()
+    quotas = list(CapacityQuota.objects.using(using).filter(season=season))
+    for quota in quotas:
+        quota.used = _registered(quota, using)
+    CapacityQuota.objects.using(using).bulk_update(quotas, ['used'])
+    invalidate(quota_cache_key(season))
+    return len(quotas)
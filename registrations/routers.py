@@ -0,0 +1,119 @@
+"""
+Read-replica routing.
+
+During a request, ReplicaRoutingMiddleware lets ReplicaRouter send reads to
+one of settings.DATABASE_REPLICAS. Writes always go to the primary and pin
+the rest of the request to it, so a view reads back what it just wrote.
+Unsafe methods (form submissions), views decorated with use_primary and
+clients that wrote within the last REPLICA_PIN_SECONDS (tracked with a
+cookie, so the page after a redirect is not served from a lagging replica)
+read from the primary from the start.
+
+Outside requests (management commands, background threads) everything uses
+the primary unless a queryset asks for replica_alias() explicitly.
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'db_pin'
+
+_SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class _RoutingState:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Routing state of the current request; None outside requests
+_state = contextvars.ContextVar('db_routing', default=None)
+
+
+def replica_alias():
+    """A replica to read from, or the primary when none are configured"""
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def read_from_replicas(pinned=False):
+    """Route reads in this block to replicas until something is written"""
+    state = _RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+def pin_to_primary():
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def use_primary(view):
+    """Serve every read of `view` from the primary"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        pin_to_primary()
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.pinned:
+            # Default routing: the primary, or the database a related
+            # instance was loaded from
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Scope replica routing to the request and remember recent writers.
+
+    Placed above SessionMiddleware so session and user lookups are routed too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = request.method not in _SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        with read_from_replicas(pinned) as state:
+            response = self.get_response(request)
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
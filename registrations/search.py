@@ -0,0 +1,105 @@
+"""
+Indexed search over team leader emails and member names.
+
+PostgreSQL serves both lookups from pg_trgm GIN indexes. SQLite has no trigram
+indexes, so a FTS5 table using the trigram tokenizer mirrors every registration
+and is kept in sync from model signals. Both are created by migration 0003.
+"""
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'registrations_search'
+
+# The FTS5 trigram tokenizer cannot match anything shorter than one trigram
+MIN_FTS_QUERY_LENGTH = 3
+
+# Rebuilds the FTS rows of the given registrations from the base tables
+_FTS_REFRESH_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, email, members)
+    SELECT r.id, r.team_leader_email, COALESCE(GROUP_CONCAT(m.name, ' | '), '')
+    FROM registrations_registration r
+    LEFT JOIN registrations_teammember m ON m.registration_id = r.id
+    {{where}}
+    GROUP BY r.id
+"""
+
+_FTS_SEARCH_SQL = f"""
+    SELECT rowid FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH %s AND email LIKE %s ESCAPE '\\'
+    UNION
+    SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s
+"""
+
+
+def uses_fts(connection):
+    """Whether searches on this connection go through the FTS5 mirror table"""
+    return connection.vendor == 'sqlite'
+
+
+def _fts_phrase(column, query):
+    """Build an FTS5 column-filtered phrase query matching `query` as a substring"""
+    return '%s : "%s"' % (column, query.replace('"', '""'))
+
+
+def _like_prefix(query):
+    """Escape LIKE wildcards in `query` and turn it into a prefix pattern"""
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+
+def refresh_search_index(registration_ids, using='default'):
+    """Re-sync the FTS rows of the given registrations (no-op outside SQLite)"""
+    connection = connections[using]
+    ids = [int(pk) for pk in registration_ids if pk is not None]
+    if not ids or not uses_fts(connection):
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids)
+        cursor.execute(_FTS_REFRESH_SQL.format(where=f'WHERE r.id IN ({placeholders})'), ids)
+
+
+def remove_from_search_index(registration_ids, using='default'):
+    """Drop the FTS rows of deleted registrations (no-op outside SQLite)"""
+    connection = connections[using]
+    ids = [int(pk) for pk in registration_ids if pk is not None]
+    if not ids or not uses_fts(connection):
+        return
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids)
+
+
+def rebuild_search_index(using='default'):
+    """Repopulate the whole FTS mirror table from the base tables"""
+    connection = connections[using]
+    if not uses_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(_FTS_REFRESH_SQL.format(where=''))
+
+
+def search_registrations(queryset, query):
+    """Filter `queryset` to teams whose leader email starts with `query`
+    or that have a member whose name contains `query` (case-insensitive)"""
+    from .models import TeamMember
+
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    connection = connections[queryset.db]
+    if uses_fts(connection) and len(query) >= MIN_FTS_QUERY_LENGTH:
+        matches = RawSQL(
+            _FTS_SEARCH_SQL,
+            (_fts_phrase('email', query), _like_prefix(query), _fts_phrase('members', query)),
+        )
+        return queryset.filter(id__in=matches)
+
+    member_matches = TeamMember.objects.filter(name__icontains=query).values('registration')
+    return queryset.filter(
+        Q(team_leader_email__istartswith=query) | Q(id__in=member_matches)
+    )
@@ -0,0 +1,130 @@
+"""
+Model signal handlers that keep derived data in sync with registrations.
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import invalidate
+from .events import record_changes, record_deletions
+from .models import CapacityQuota, Registration, RegistrationEvent, TeamMember
+from .quotas import count_places, quota_cache_key, recount_quota
+from .rollup import bucket, count_registration
+from .search import refresh_search_index, remove_from_search_index
+from .versions import bump_version
+
+
+def _touch_registration(registration_id, using):
+    """Bump the team's updated_at so member edits change the export
+    validators, and report the edit on the change feed"""
+    if registration_id is not None:
+        Registration.objects.using(using).filter(pk=registration_id).update(updated_at=timezone.now())
+        bump_version(using)
+        record_changes(RegistrationEvent.KIND_UPDATED, [registration_id], using)
+
+
+def _quota_key(registration):
+    return registration.season, registration.project_field, registration.project_category
+
+
+def _rollup_key(registration):
+    return bucket(registration.registration_date), registration.project_field, registration.project_category
+
+
+@receiver(pre_save, sender=Registration)
+def registration_saving(sender, instance, raw=False, using='default', **kwargs):
+    """Remember the stored version of an edited team, to move its quota
+    places and hourly rollup bucket"""
+    if not raw and not instance._state.adding:
+        instance._previous = Registration.objects.using(using).filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=Registration)
+def registration_saved(sender, instance, created=False, raw=False, using='default', **kwargs):
+    """Mirror the leader email into the search index, drop cached reads,
+    count the team against its quotas and hourly rollup and report the change
+    on the change feed"""
+    invalidate(Registration.email_cache_key(instance.team_leader_email, instance.season))
+    # Registration.create_team indexes and reports the team with its members
+    pending = created and getattr(instance, '_team_pending', False)
+    if not raw:
+        bump_version(using)
+        if not pending:
+            refresh_search_index([instance.pk], using=using)
+        previous = getattr(instance, '_previous', None)
+        if created:
+            count_places(*_quota_key(instance), 1, using)
+            count_registration(*_rollup_key(instance), 1, using)
+        elif previous is not None:
+            if _quota_key(previous) != _quota_key(instance):
+                count_places(*_quota_key(previous), -1, using)
+                count_places(*_quota_key(instance), 1, using)
+            if _rollup_key(previous) != _rollup_key(instance):
+                count_registration(*_rollup_key(previous), -1, using)
+                count_registration(*_rollup_key(instance), 1, using)
+        if not pending:
+            kind = RegistrationEvent.KIND_CREATED if created else RegistrationEvent.KIND_UPDATED
+            record_changes(kind, [instance.pk], using)
+
+
+@receiver(post_delete, sender=Registration)
+def registration_deleted(sender, instance, using='default', **kwargs):
+    """Drop a deleted team from the search index, cached reads, its quotas
+    and the hourly rollup"""
+    invalidate(Registration.email_cache_key(instance.team_leader_email, instance.season))
+    remove_from_search_index([instance.pk], using=using)
+    count_places(*_quota_key(instance), -1, using)
+    count_registration(*_rollup_key(instance), -1, using)
+    bump_version(using)
+    record_deletions([{'id': instance.pk, 'team_leader_email': instance.team_leader_email, 'season': instance.season}], using)
+
+
+@receiver(post_save, sender=TeamMember)
+def team_member_saved(sender, instance, raw=False, using='default', **kwargs):
+    """Re-index the team of an added or renamed member"""
+    if not raw:
+        refresh_search_index([instance.registration_id], using=using)
+        _touch_registration(instance.registration_id, using)
+
+
+@receiver(post_delete, sender=TeamMember)
+def team_member_deleted(sender, instance, using='default', origin=None, **kwargs):
+    """Re-index the team a deleted member belonged to"""
+    if getattr(origin, 'model', type(origin)) is Registration:
+        # Cascade from deleting the team itself, which is reported on its own
+        return
+    refresh_search_index([instance.registration_id], using=using)
+    _touch_registration(instance.registration_id, using)
+
+
+def _quota_scope(quota):
+    return quota.season, quota.dimension, quota.value
+
+
+@receiver(pre_save, sender=CapacityQuota)
+def quota_saving(sender, instance, raw=False, using='default', **kwargs):
+    """Remember what an edited quota applied to, to recount it when that moves"""
+    if not raw and not instance._state.adding:
+        instance._previous = CapacityQuota.objects.using(using).filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=CapacityQuota)
+def quota_saved(sender, instance, created=False, raw=False, using='default', **kwargs):
+    """New or changed limits apply to the next submission; a new quota, or
+    one moved to another season, field or category, counts the teams already
+    registered there"""
+    invalidate(quota_cache_key(instance.season))
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    if previous is not None and previous.season != instance.season:
+        invalidate(quota_cache_key(previous.season))
+    if created or (previous is not None and _quota_scope(previous) != _quota_scope(instance)):
+        recount_quota(instance, using)
+
+
+@receiver(post_delete, sender=CapacityQuota)
+def quota_deleted(sender, instance, **kwargs):
+    """A removed quota no longer caps the next submission"""
+    invalidate(quota_cache_key(instance.season))
@@ -0,0 +1,125 @@
+"""
+Slow-query logging through connection.execute_wrapper.
+
+Every SQL statement slower than settings.SLOW_QUERY_THRESHOLD_MS is written
+as one JSON line to the 'registrations.slow_queries' logger (a rotating file,
+see LOGGING) with its duration, a fingerprint of the normalised SQL, the
+shape of its parameters, the view being served and the first stack frame
+inside this project. The slow_query_report command summarises the log.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('registrations.slow_queries')
+
+# Name of the view (or job) the current queries are issued for
+current_view = contextvars.ContextVar('slow_query_view', default='-')
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+_THIS_FILE = str(Path(__file__).resolve())
+
+
+def normalize_sql(sql):
+    """Replace literals and collapse IN-lists so similar queries group together"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def params_shape(params, many=False):
+    """Describe parameters by type and count without logging their values"""
+    if params is None:
+        return 'none'
+    if many:
+        params = list(params)
+        return f'{len(params)} x [{params_shape(params[0]) if params else ""}]'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items()) + '}'
+    counts = {}
+    for value in params:
+        name = type(value).__name__
+        counts[name] = counts.get(name, 0) + 1
+    return ', '.join(f'{name}x{count}' if count > 1 else name for name, count in counts.items())
+
+
+def project_frame():
+    """First stack frame in this project's code, outside this module and Django"""
+    for frame in reversed(traceback.extract_stack()):
+        filename = str(Path(frame.filename).resolve())
+        if filename.startswith(_PROJECT_ROOT) and filename != _THIS_FILE and 'site-packages' not in filename:
+            return f'{Path(filename).relative_to(_PROJECT_ROOT)}:{frame.lineno} in {frame.name}'
+    return '-'
+
+
+class SlowQueryLogger:
+    """execute_wrapper that logs statements over the configured threshold"""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                logger.warning(json.dumps({
+                    'duration_ms': round(duration_ms, 2),
+                    'fingerprint': fingerprint(sql),
+                    'sql': normalize_sql(sql),
+                    'params': params_shape(params, many),
+                    'view': current_view.get(),
+                    'frame': project_frame(),
+                    'database': self.alias,
+                }))
+
+
+@contextmanager
+def log_slow_queries(view_name):
+    """Log slow queries on every database connection, attributed to `view_name`"""
+    token = current_view.set(view_name)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(SlowQueryLogger(connection.alias)))
+            yield
+    finally:
+        current_view.reset(token)
+
+
+class SlowQueryMiddleware:
+    """Log slow queries for every request, attributed to the resolved view"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with log_slow_queries(request.path_info):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        current_view.set(match.view_name if match and match.view_name else request.path_info)
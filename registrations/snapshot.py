@@ -0,0 +1,336 @@
+"""
+Compact in-process snapshot of registrations for dashboard statistics.
+
+Each live registration takes 14 bytes in parallel typed arrays: id, field
+and category codes, team size, members per academic level and registration
+date. Running totals per field, category and registration day are kept
+alongside, so statistics filtered like the dashboard (field, category, whole
+days) add up a few small grids in microseconds without touching the
+database; other date bounds scan the arrays.
+
+registration_snapshot() returns the process's snapshot, first comparing it
+with the registrations version (see registrations.versions), a single-row
+read that every write to the team tables bumps. Only when the version moved
+is the table looked at: its (count, latest updated_at) pair is read through
+the updated_at index and rows updated since the snapshot's watermark are
+re-read; member edits bump their team's updated_at, so this also picks up
+team changes. If the row count still disagrees afterwards (deletions,
+archiving, back-dated bulk loads) the snapshot is rebuilt from scratch.
+"""
+
+import bisect
+import sys
+import threading
+from array import array
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Registration, TeamMember
+from .versions import registrations_version
+
+FIELDS = [value for value, _ in Registration.PROJECT_FIELD_CHOICES]
+CATEGORIES = [value for value, _ in Registration.PROJECT_CATEGORY_CHOICES]
+LEVELS = [value for value, _ in TeamMember.LEVEL_CHOICES]
+_FIELD_CODES = {value: code for code, value in enumerate(FIELDS)}
+_CATEGORY_CODES = {value: code for code, value in enumerate(CATEGORIES)}
+_LEVEL_CODES = {value: code for code, value in enumerate(LEVELS)}
+
+# Rows updated this long before the watermark are re-read on refresh, so a
+# transaction that committed after a refresh with an older updated_at is not missed
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+# A refresh that finds more changed rows than this share of the snapshot
+# (and at least REBUILD_MIN_ROWS) rebuilds it instead of patching
+REBUILD_RATIO = 0.25
+REBUILD_MIN_ROWS = 1000
+
+_ROW_FIELDS = ('id', 'project_field', 'project_category', 'registration_date')
+
+
+def _timestamp(value):
+    return int(value.timestamp())
+
+
+def _day(timestamp, tz=None):
+    """Local calendar day (as an ordinal) of a Unix timestamp, matching the
+    day boundaries of the dashboard's date filters"""
+    return datetime.fromtimestamp(timestamp, tz or timezone.get_current_timezone()).date().toordinal()
+
+
+def _midnight_day(value):
+    """Day ordinal of a datetime at local midnight, or None for other times"""
+    local = timezone.localtime(value)
+    if local.time() != dt_time.min:
+        return None
+    return local.date().toordinal()
+
+
+def _table_state():
+    """(row count, latest updated_at) of the registration table"""
+    return tuple(Registration.objects.order_by().aggregate(count=Count('id'), latest=Max('updated_at')).values())
+
+
+def _grid():
+    """[field][category] = [teams, members, *members per level]"""
+    return [[[0] * (2 + len(LEVELS)) for _ in CATEGORIES] for _ in FIELDS]
+
+
+class RegistrationSnapshot:
+    """Registrations as parallel arrays ordered by id; position i of every
+    array describes the same team"""
+
+    __slots__ = ('ids', 'fields', 'categories', 'sizes', 'levels', 'dates', 'totals', 'days', 'version', 'latest')
+
+    def __init__(self):
+        self.ids = array('I')
+        self.fields = array('B')
+        self.categories = array('B')
+        self.sizes = array('B')
+        # len(LEVELS) member counts per team, back to back
+        self.levels = array('B')
+        # Registration dates as Unix seconds
+        self.dates = array('I')
+        # Running totals over all teams and per registration day, so
+        # field/category/day filters add up a few grids instead of scanning
+        self.totals = _grid()
+        self.days = {}
+        # Registrations version and latest updated_at the arrays reflect
+        self.version = None
+        self.latest = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls):
+        """Build a snapshot of all live registrations"""
+        snapshot = cls()
+        # Read first: a write committed while loading moves it again
+        snapshot.version = registrations_version()
+        _, snapshot.latest = _table_state()
+        for pk, field, category, registered in (
+            Registration.objects.order_by('pk').values_list(*_ROW_FIELDS).iterator(chunk_size=5000)
+        ):
+            snapshot.ids.append(pk)
+            snapshot.fields.append(_FIELD_CODES[field])
+            snapshot.categories.append(_CATEGORY_CODES[category])
+            snapshot.dates.append(_timestamp(registered))
+        snapshot.sizes = array('B', bytes(len(snapshot)))
+        snapshot.levels = array('B', bytes(len(snapshot) * len(LEVELS)))
+        for pk, per_level in _member_counts(TeamMember.objects.exclude(registration=None)).items():
+            position = snapshot._position(pk)
+            if position is not None:
+                snapshot.levels[position * len(LEVELS):(position + 1) * len(LEVELS)] = array('B', per_level)
+                snapshot.sizes[position] = sum(per_level)
+        snapshot._recount()
+        return snapshot
+
+    def _recount(self):
+        """Rebuild the running totals from the arrays in one pass"""
+        self.totals = _grid()
+        self.days = {}
+        tz = timezone.get_current_timezone()
+        # Local days only change on quarter-hour boundaries in every time zone
+        day_of_quarter = {}
+        width = len(LEVELS)
+        for position, registered in enumerate(self.dates):
+            quarter = registered // 900
+            day = day_of_quarter.get(quarter)
+            if day is None:
+                day = day_of_quarter[quarter] = _day(registered, tz)
+            if day not in self.days:
+                self.days[day] = _grid()
+            field, category = self.fields[position], self.categories[position]
+            levels = self.levels[position * width:(position + 1) * width]
+            for cell in (self.totals[field][category], self.days[day][field][category]):
+                cell[0] += 1
+                cell[1] += self.sizes[position]
+                for level in range(width):
+                    cell[2 + level] += levels[level]
+
+    def _contribute(self, position, sign):
+        """Add (sign=1) or remove (sign=-1) a team from the running totals"""
+        day = _day(self.dates[position])
+        if day not in self.days:
+            self.days[day] = _grid()
+        start = position * len(LEVELS)
+        values = [1, self.sizes[position], *self.levels[start:start + len(LEVELS)]]
+        for cell in (self.totals[self.fields[position]][self.categories[position]],
+                     self.days[day][self.fields[position]][self.categories[position]]):
+            for index, value in enumerate(values):
+                cell[index] += sign * value
+
+    def _position(self, pk):
+        position = bisect.bisect_left(self.ids, pk)
+        if position < len(self.ids) and self.ids[position] == pk:
+            return position
+        return None
+
+    def _insert(self, position, row):
+        pk, field, category, registered = row
+        self.ids.insert(position, pk)
+        self.fields.insert(position, _FIELD_CODES[field])
+        self.categories.insert(position, _CATEGORY_CODES[category])
+        self.sizes.insert(position, 0)
+        start = position * len(LEVELS)
+        self.levels[start:start] = array('B', [0] * len(LEVELS))
+        self.dates.insert(position, _timestamp(registered))
+        self._contribute(position, 1)
+
+    def _upsert(self, row):
+        pk, field, category, registered = row
+        position = self._position(pk)
+        if position is None:
+            # Usually appends; a late commit below the highest id shifts the arrays
+            self._insert(bisect.bisect_left(self.ids, pk), row)
+            return
+        self._contribute(position, -1)
+        self.fields[position] = _FIELD_CODES[field]
+        self.categories[position] = _CATEGORY_CODES[category]
+        self.dates[position] = _timestamp(registered)
+        self._contribute(position, 1)
+
+    def _set_members(self, counts):
+        """Replace the member counts of the teams in `counts`
+        ({registration id: [members per level]})"""
+        for pk, per_level in counts.items():
+            position = self._position(pk)
+            if position is None:
+                continue
+            self._contribute(position, -1)
+            start = position * len(LEVELS)
+            self.levels[start:start + len(LEVELS)] = array('B', per_level)
+            self.sizes[position] = sum(per_level)
+            self._contribute(position, 1)
+
+    def refresh(self):
+        """Bring the snapshot up to date; returns the snapshot to use from
+        now on, which is a new one when it had to be rebuilt"""
+        version = registrations_version()
+        if version == self.version:
+            return self
+        count, latest = _table_state()
+        if self.latest is None or latest is None:
+            return type(self).load()
+
+        changed = list(
+            Registration.objects.filter(updated_at__gte=self.latest - REFRESH_OVERLAP)
+            .order_by('pk').values_list(*_ROW_FIELDS)
+        )
+        if len(changed) > max(REBUILD_RATIO * len(self), REBUILD_MIN_ROWS):
+            return type(self).load()
+        for row in changed:
+            self._upsert(row)
+        ids = [row[0] for row in changed]
+        counts = _member_counts(TeamMember.objects.filter(registration_id__in=ids))
+        # Teams whose last member was removed have no rows in counts
+        counts.update({pk: [0] * len(LEVELS) for pk in ids if pk not in counts})
+        self._set_members(counts)
+        if len(self) != count:
+            return type(self).load()
+        self.version, self.latest = version, latest
+        return self
+
+    def _grids(self, date_from, date_to):
+        """Running-total grids covering [date_from, date_to), or None when a
+        bound is not a local midnight and the arrays must be scanned"""
+        if not (date_from or date_to):
+            return [self.totals]
+        first = _midnight_day(date_from) if date_from else 0
+        last = _midnight_day(date_to) if date_to else float('inf')
+        if first is None or last is None:
+            return None
+        return [grid for day, grid in self.days.items() if first <= day < last]
+
+    def _scan(self, date_from, date_to):
+        """A grid of the teams registered in [date_from, date_to)"""
+        grid = _grid()
+        start = _timestamp(date_from) if date_from else 0
+        end = _timestamp(date_to) if date_to else 2 ** 32
+        for position, registered in enumerate(self.dates):
+            if start <= registered < end:
+                cell = grid[self.fields[position]][self.categories[position]]
+                offset = position * len(LEVELS)
+                cell[0] += 1
+                cell[1] += self.sizes[position]
+                for level in range(len(LEVELS)):
+                    cell[2 + level] += self.levels[offset + level]
+        return grid
+
+    def stats(self, project_field=None, project_category=None, date_from=None, date_to=None):
+        """Dashboard statistics for the teams matching the filters: totals
+        and teams per field and category, plus members per level; dates are
+        aware datetimes, date_to exclusive"""
+        grids = self._grids(date_from, date_to)
+        if grids is None:
+            grids = [self._scan(date_from, date_to)]
+        teams = members = 0
+        by_field = [0] * len(FIELDS)
+        by_category = [0] * len(CATEGORIES)
+        by_level = [0] * len(LEVELS)
+        for grid in grids:
+            for f, row in enumerate(grid):
+                if project_field and FIELDS[f] != project_field:
+                    continue
+                for c, cell in enumerate(row):
+                    if project_category and CATEGORIES[c] != project_category:
+                        continue
+                    teams += cell[0]
+                    members += cell[1]
+                    by_field[f] += cell[0]
+                    by_category[c] += cell[0]
+                    for level in range(len(LEVELS)):
+                        by_level[level] += cell[2 + level]
+        return {
+            'total_registrations': teams,
+            'total_members': members,
+            'by_field': [(label, by_field[code]) for code, (_, label) in enumerate(Registration.PROJECT_FIELD_CHOICES)],
+            'by_category': [(label, by_category[code]) for code, (_, label) in enumerate(Registration.PROJECT_CATEGORY_CHOICES)],
+            'by_level': [(label, by_level[code]) for code, (_, label) in enumerate(TeamMember.LEVEL_CHOICES)],
+        }
+
+    def nbytes(self):
+        """Memory held by the per-team arrays, headers included; the running
+        totals add a fixed amount per registration day on top"""
+        arrays = (self.ids, self.fields, self.categories, self.sizes, self.levels, self.dates)
+        return sum(sys.getsizeof(values) for values in arrays)
+
+
+def _member_counts(members):
+    """{registration id: [members per level]} for a TeamMember queryset"""
+    counts = {}
+    for pk, level, number in members.order_by().values_list('registration_id', 'level').annotate(Count('id')):
+        counts.setdefault(pk, [0] * len(LEVELS))[_LEVEL_CODES[level]] = number
+    return counts
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _current():
+    global _snapshot
+    _snapshot = RegistrationSnapshot.load() if _snapshot is None else _snapshot.refresh()
+    return _snapshot
+
+
+def registration_snapshot():
+    """This process's snapshot, refreshed if registrations changed"""
+    with _lock:
+        return _current()
+
+
+def snapshot_stats(**filters):
+    """RegistrationSnapshot.stats() on the current snapshot; the lock keeps
+    another thread's refresh from changing the arrays mid-scan"""
+    with _lock:
+        return _current().stats(**filters)
+
+
+def reset_snapshot():
+    """Drop the process's snapshot; the next call rebuilds it"""
+    global _snapshot
+    with _lock:
+        _snapshot = None
@@ -68,21 +68,104 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Live duplicate check for the team leader email.
+    // Requests are sent only once typing pauses, answers are cached per
+    // address for the life of the page (short-lived for available ones), and
+    // a new keystroke aborts the request still in flight.
+    const EMAIL_CHECK_DELAY = 400;
+    const AVAILABLE_CACHE_MS = 30000;
+    const emailCheckCache = new Map();
+    let emailCheckTimer = null;
+    let emailCheckController = null;
+
+    if (emailField && emailField.dataset.checkUrl) {
+        const emailStatus = document.createElement('div');
+        emailStatus.className = 'email-status';
+        emailStatus.style.cssText = 'font-size: 12px; margin-top: 4px;';
+        emailField.parentNode.appendChild(emailStatus);
+
+        emailField.addEventListener('input', function() {
+            clearTimeout(emailCheckTimer);
+            if (emailCheckController) {
+                emailCheckController.abort();
+                emailCheckController = null;
+            }
+            showEmailStatus(emailStatus, null);
+
+            const email = this.value.trim();
+            if (!englishEmailRegex.test(email)) {
+                return;
+            }
+            const cached = emailCheckCache.get(email);
+            if (cached && (cached.exists || cached.expires > Date.now())) {
+                showEmailStatus(emailStatus, cached);
+                return;
+            }
+            emailCheckTimer = setTimeout(function() {
+                checkEmail(emailField.dataset.checkUrl, email, emailStatus);
+            }, EMAIL_CHECK_DELAY);
+        });
+    }
+
+    function checkEmail(url, email, emailStatus) {
+        const controller = new AbortController();
+        emailCheckController = controller;
+        fetch(`${url}?email=${encodeURIComponent(email)}`, {
+            headers: { 'Accept': 'application/json' },
+            signal: controller.signal
+        })
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (!data) {
+                    return;
+                }
+                const result = { exists: data.exists, error: data.error, expires: Date.now() + AVAILABLE_CACHE_MS };
+                emailCheckCache.set(email, result);
+                if (emailField.value.trim() === email) {
+                    showEmailStatus(emailStatus, result);
+                }
+            })
+            .catch(error => {
+                // Aborted because the user kept typing, or offline: the
+                // server still checks on submit
+                if (error.name !== 'AbortError') {
+                    console.warn('Email check failed:', error);
+                }
+            })
+            .finally(() => {
+                if (emailCheckController === controller) {
+                    emailCheckController = null;
+                }
+            });
+    }
+
+    function showEmailStatus(emailStatus, result) {
+        if (!result) {
+            emailStatus.textContent = '';
+        } else if (result.exists) {
+            emailStatus.textContent = result.error;
+            emailStatus.style.color = '#dc3545';
+        } else {
+            emailStatus.textContent = 'Email is available';
+            emailStatus.style.color = '#28a745';
+        }
+    }
+
     function validateEnglishCharacters() {
         let isValid = true;
         let firstErrorField = null;
 
         // Validate team leader email
-        const email = document.querySelector('[name="teamLeaderEmail"]').value.trim();
+        const email = document.querySelector('[name="team_leader_email"]').value.trim();
         if (email && !englishEmailRegex.test(email)) {
             showFieldError(
-                document.querySelector('[name="teamLeaderEmail"]'),
+                document.querySelector('[name="team_leader_email"]'),
                 'Email must contain only English letters, numbers, and valid email format'
             );
             isValid = false;
-            if (!firstErrorField) firstErrorField = document.querySelector('[name="teamLeaderEmail"]');
+            if (!firstErrorField) firstErrorField = document.querySelector('[name="team_leader_email"]');
         } else {
-            clearFieldError(document.querySelector('[name="teamLeaderEmail"]'));
+            clearFieldError(document.querySelector('[name="team_leader_email"]'));
         }
 
         // Validate all name fields
@@ -1,3 +1,1425 @@
-from django.test import TestCase
+import gc
+import gzip
+import io
+import json
+import logging
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+from concurrent.futures import Future
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, reset_queries
+from django.db.models import Count
+from django.http import FileResponse, StreamingHttpResponse
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import get_or_compute
+from .compression import CompressionMiddleware, brotli, choose_encoding, encoding_qualities
+from .duplicates import duplicate_groups, duplicate_report
+from .exports import id_ranges, run_export_job
+from .forms import RegistrationFilterForm
+from .log import JsonFormatter, NonBlockingStreamHandler, SamplingFilter
+from .outbox import queue_confirmation, send_pending
+from .models import (
+    ArchivedRegistration, ArchivedTeamMember, CapacityQuota, ExportJob, HourlyRollup, OutboxEmail, Registration,
+    RegistrationEvent, TeamMember, normalize_name,
+)
+from .pagination import EstimatedCountPaginator
+from .purge import truncate_tables
+from .profiling import make_token
+from .management.commands.startup_profile import parse_importtime
+from .quotas import QuotaFull, quota_cache_key, remaining_capacity, reserve_places
+from .rollup import bucket, rebuild_rollup
+from .routers import PIN_COOKIE
+from .slow_queries import normalize_sql
+from .snapshot import RegistrationSnapshot, reset_snapshot, snapshot_stats
+from .search import FTS_TABLE, search_registrations, uses_fts
+from .warmup import warm_up
+
+
+def create_team(email, *member_names, project_field='health', project_category='student_research'):
+    """Create a registration with members in the given order"""
+    return Registration.create_team(
+        [TeamMember(name=name, level='bachelor', order=order) for order, name in enumerate(member_names, start=1)],
+        team_leader_email=email,
+        project_field=project_field,
+        project_category=project_category,
+        accept_terms=True,
+    )
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.alpha = create_team('alpha.team@example.com', 'John Smith', 'Jane Doe')
+        self.beta = create_team('beta@example.com', 'Omar Khalil', 'Sara Adel')
+
+    def search(self, query):
+        return set(search_registrations(Registration.objects.all(), query))
+
+    def test_email_prefix(self):
+        self.assertEqual(self.search('alpha'), {self.alpha})
+        self.assertEqual(self.search('ALPHA.T'), {self.alpha})
+        # Prefix only: a substring in the middle of the email does not match
+        self.assertEqual(self.search('team@'), set())
+
+    def test_member_name_substring(self):
+        self.assertEqual(self.search('khal'), {self.beta})
+        self.assertEqual(self.search('doe'), {self.alpha})
+
+    def test_short_query_falls_back_to_orm(self):
+        self.assertEqual(self.search('be'), {self.beta})
+
+    def test_index_follows_member_changes(self):
+        member = self.beta.members.get(order=2)
+        member.name = 'Nour Hassan'
+        member.save()
+        self.assertEqual(self.search('hassan'), {self.beta})
+        self.assertEqual(self.search('adel'), set())
+
+        TeamMember.objects.create(registration=self.alpha, name='Youssef Ibrahim', level='phd', order=3)
+        self.assertEqual(self.search('ibrahim'), {self.alpha})
+
+        self.alpha.delete()
+        self.assertEqual(self.search('smith'), set())
+
+    def test_dashboard_search(self):
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        response = self.client.get(reverse('admin_dashboard'), {'q': 'omar'})
+        self.assertEqual(list(response.context['registrations']), [self.beta])
+
+
+class FilterIndexTests(TestCase):
+    """Each filter combination must be served by its composite index, in order"""
+    cases = [
+        ({'project_field': 'health'}, 'reg_field_date_idx'),
+        ({'project_category': 'prototype'}, 'reg_category_date_idx'),
+        ({'project_field': 'health', 'project_category': 'prototype'}, 'reg_field_cat_date_idx'),
+        ({'date_from': '2025-01-01', 'date_to': '2025-02-01'}, 'reg_date_idx'),
+        ({'project_field': 'energy', 'date_from': '2025-01-01'}, 'reg_field_date_idx'),
+        ({}, 'reg_date_idx'),
+    ]
+
+    def test_filtered_queries_use_indexes(self):
+        for params, index in self.cases:
+            with self.subTest(params=params):
+                plan = RegistrationFilterForm(params).filter(Registration.objects.all()).explain()
+                self.assertIn(f'USING INDEX {index}', plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_dashboard_and_export_filters(self):
+        health = create_team('health@example.com', 'John Smith', 'Jane Doe', project_field='health')
+        create_team('energy@example.com', 'Omar Khalil', 'Sara Adel', project_field='energy')
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+
+        response = self.client.get(reverse('admin_dashboard'), {'project_field': 'health'})
+        self.assertEqual(list(response.context['registrations']), [health])
+        self.assertContains(response, 'export-csv/?project_field=health')
+
+        export = self.client.get(reverse('export_csv'), {'project_field': 'health'}).content.decode()
+        self.assertIn('health@example.com', export)
+        self.assertNotIn('energy@example.com', export)
+
+    def test_date_range_is_inclusive(self):
+        registration = create_team('leader@example.com', 'John Smith', 'Jane Doe')
+        today = registration.registration_date.date().isoformat()
+        queryset = RegistrationFilterForm({'date_from': today, 'date_to': today}).filter(Registration.objects.all())
+        self.assertEqual(list(queryset), [registration])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+    def changelist_queries(self, url_name, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name), params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        create_team('first@example.com', 'John Smith', 'Jane Doe')
+        _, few = self.changelist_queries('admin:registrations_registration_changelist')
+        _, few_members = self.changelist_queries('admin:registrations_teammember_changelist')
+        for i in range(10):
+            create_team(f'team{i}@example.com', 'Omar Khalil', 'Sara Adel', 'Nour Hassan')
+        response, many = self.changelist_queries('admin:registrations_registration_changelist')
+        _, many_members = self.changelist_queries('admin:registrations_teammember_changelist')
+        self.assertEqual(few, many)
+        self.assertEqual(few_members, many_members)
+        self.assertContains(response, '<td class="field-members_count">3</td>', html=True)
+
+    def test_changelist_search_uses_index(self):
+        beta = create_team('beta@example.com', 'Omar Khalil', 'Sara Adel')
+        create_team('alpha@example.com', 'John Smith', 'Jane Doe')
+        response, _ = self.changelist_queries('admin:registrations_registration_changelist', {'q': 'khalil'})
+        self.assertEqual(list(response.context['cl'].result_list), [beta])
+
+
+@override_settings(APPROXIMATE_COUNT_THRESHOLD=1000)
+class ApproximateCountTests(TestCase):
+    def setUp(self):
+        create_team('leader@example.com', 'John Smith', 'Jane Doe', project_field='energy')
+
+    def paginate(self, queryset):
+        paginator = EstimatedCountPaginator(queryset, 10)
+        return paginator.count, paginator.count_is_estimate
+
+    def test_exact_count_without_estimates(self):
+        self.assertEqual(self.paginate(Registration.objects.all()), (1, False))
+
+    @mock.patch('registrations.pagination.estimate_row_count', return_value=250000)
+    def test_table_estimate_above_threshold(self, estimate):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginate(Registration.objects.all()), (250000, True))
+
+    @mock.patch('registrations.pagination.estimate_queryset_count', return_value=40000)
+    def test_filtered_estimate_above_threshold(self, estimate):
+        self.assertEqual(self.paginate(Registration.objects.filter(project_field='energy')), (40000, True))
+
+    @mock.patch('registrations.pagination.estimate_row_count', return_value=999)
+    def test_exact_count_below_threshold(self, estimate):
+        self.assertEqual(self.paginate(Registration.objects.all()), (1, False))
+
+    @mock.patch('registrations.pagination.estimate_queryset_count', return_value=250000)
+    def test_dashboard_shows_estimate(self, estimate):
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        # Without a search the snapshot supplies the exact total
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).context['total_registrations'], 1)
+        response = self.client.get(reverse('admin_dashboard'), {'q': 'smith'})
+        self.assertEqual(response.context['total_registrations'], 250000)
+        self.assertContains(response, '~250000')
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_value_served_while_one_caller_recomputes(self):
+        get_or_compute('key', lambda: 'old', ttl=60, stale_ttl=60)
+        with mock.patch('registrations.cache.time.time', return_value=time.time() + 90):
+            # The lock is held elsewhere: serve stale without recomputing
+            cache.add('key:lock', 'other', 10)
+            self.assertEqual(get_or_compute('key', lambda: 'new', ttl=60, stale_ttl=60), 'old')
+            cache.delete('key:lock')
+            self.assertEqual(get_or_compute('key', lambda: 'new', ttl=60, stale_ttl=60), 'new')
+
+    def test_cold_miss_computes_once(self):
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 42
+
+        threads = [
+            threading.Thread(target=lambda: results.append(get_or_compute('cold', compute, ttl=60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [42] * 8)
+
+    def test_email_check_caches_taken_addresses_only(self):
+        self.assertFalse(Registration.email_exists('leader@example.com'))
+        # Registered from another worker: nothing invalidates this cache
+        Registration.objects.bulk_create([Registration(team_leader_email='leader@example.com', accept_terms=True,
+                                                       project_field='health', project_category='prototype')])
+        self.assertTrue(Registration.email_exists('leader@example.com'))
+        with self.assertNumQueries(0):
+            self.assertTrue(Registration.email_exists('leader@example.com'))
+        response = self.client.post(
+            reverse('validate_email'), {'email': 'leader@example.com'}, content_type='application/json'
+        )
+        self.assertEqual(response.json()['exists'], True)
+
+    def test_duplicate_past_the_check_gets_the_form_error(self):
+        create_team('leader@example.com', 'John Smith')
+        data = {
+            'team_leader_email': 'leader@example.com',
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+        }
+        # As when a concurrent submission commits between check and insert
+        with mock.patch.object(Registration, 'email_exists', return_value=False):
+            response = self.client.post(reverse('registration_index'), data)
+        self.assertContains(response, 'This email is already registered in the system')
+        self.assertNotContains(response, 'Database error')
+        self.assertEqual(Registration.objects.count(), 1)
+
+    def test_live_email_check_is_browser_cacheable(self):
+        url = reverse('validate_email')
+        response = self.client.get(url, {'email': 'leader@example.com'})
+        self.assertEqual(response.json()['exists'], False)
+        self.assertIn('max-age=10', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        create_team('leader@example.com', 'John Smith')
+        self.assertEqual(self.client.get(url, {'email': ' leader@example.com '}).json()['exists'], True)
+        self.assertEqual(self.client.get(url).json()['error'], 'Email is required')
+
+    def test_export_etag_changes_with_member_edits(self):
+        registration = create_team('leader@example.com', 'John Smith', 'Jane Doe')
+        etag = self.client.get(reverse('export_csv'))['ETag']
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse('export_csv'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # The ETag comes from the version row, not an aggregate over the table
+        self.assertEqual([q['sql'] for q in ctx.captured_queries if 'registrations_registration"' in q['sql']], [])
+
+        member = registration.members.first()
+        member.name = 'John Smyth'
+        member.save()
+        response = self.client.get(reverse('export_csv'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('John Smyth', response.content.decode())
+
+    def test_export_etag_sees_writes_from_other_workers(self):
+        create_team('leader@example.com', 'John Smith')
+        etag = self.client.get(reverse('export_csv'))['ETag']
+        # A bulk write elsewhere sends no signal to invalidate anything here
+        Registration.objects.bulk_create([Registration(team_leader_email='other@example.com', accept_terms=True,
+                                                       project_field='health', project_category='prototype')])
+        response = self.client.get(reverse('export_csv'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('other@example.com', response.content.decode())
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        self.enterContext(override_settings(EXPORT_SPOOL_DIR=spool.name))
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        create_team('health@example.com', 'John Smith', 'Jane Doe', project_field='health')
+        create_team('energy@example.com', 'Omar Khalil', 'Sara Adel', project_field='energy')
+
+    def start(self, params=''):
+        # The worker thread is started on commit; run it inline instead
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(reverse('start_export_job') + params)
+        return response, callbacks
+
+    def test_job_runs_and_serves_file(self):
+        response, callbacks = self.start('?project_field=health')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        job = response.json()
+        self.assertEqual(job['status'], 'pending')
+
+        run_export_job(job['id'])
+        status = self.client.get(job['status_url']).json()
+        self.assertEqual((status['status'], status['progress'], status['rows_written']), ('done', 100, 1))
+
+        download = self.client.get(status['download_url'])
+        content = b''.join(download.streaming_content).decode()
+        self.assertIn('health@example.com', content)
+        self.assertNotIn('energy@example.com', content)
+
+    def test_same_snapshot_reuses_job(self):
+        first, _ = self.start()
+        run_export_job(first.json()['id'])
+        second, callbacks = self.start()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        self.assertEqual(callbacks, [])
+
+        create_team('new@example.com', 'Nour Hassan', 'Youssef Ibrahim')
+        third, _ = self.start()
+        self.assertNotEqual(third.json()['id'], first.json()['id'])
+
+    def test_requires_staff(self):
+        self.client.logout()
+        response, _ = self.start()
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(ExportJob.objects.exists())
+
+
+class InlineExecutor:
+    """ProcessPoolExecutor stand-in running tasks in the test's own
+    connection, which worker processes could not see"""
+
+    def __init__(self, max_workers=None, initializer=None):
+        if initializer:
+            initializer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class ParallelExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = Path(directory.name) / 'registrations.csv'
+
+    def test_id_ranges_cover_the_span(self):
+        self.assertEqual(id_ranges(1, 10, 3), [(1, 5), (5, 9), (9, 11)])
+        self.assertEqual(id_ranges(7, 7, 4), [(7, 8)])
+        self.assertEqual(id_ranges(None, None, 4), [])
+
+    def test_parts_are_joined_in_id_order(self):
+        for i in range(7):
+            create_team(f'team{i}@example.com', 'John Smith', project_field='health' if i % 2 else 'energy')
+        with mock.patch('registrations.exports.ProcessPoolExecutor', InlineExecutor):
+            out = io.StringIO()
+            call_command('export_parallel', str(self.output), workers=2, parts=3, filters='project_field=health',
+                         stdout=out)
+        self.assertIn('Exported 3 registrations with 2 workers', out.getvalue())
+        rows = self.output.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(rows[0].split(',')[0], 'Registration ID')
+        expected = Registration.objects.filter(project_field='health').order_by('pk').values_list('pk', flat=True)
+        self.assertEqual([int(row.split(',')[0]) for row in rows[1:]], list(expected))
+        self.assertEqual(sorted(path.name for path in self.output.parent.iterdir()), ['registrations.csv'])
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        profiles = tempfile.TemporaryDirectory()
+        self.addCleanup(profiles.cleanup)
+        self.enterContext(override_settings(PROFILER_DIR=profiles.name))
+
+    def test_not_profiled_without_opt_in(self):
+        response = self.client.get(reverse('registration_index'), {'_profile': '1'})
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_signed_header_profiles_request(self):
+        response = self.client.get(reverse('registration_index'), HTTP_X_PROFILE_TOKEN=make_token())
+        self.assertIn('X-Profile-Id', response)
+        bad = self.client.get(reverse('registration_index'), HTTP_X_PROFILE_TOKEN='profile:forged')
+        self.assertNotIn('X-Profile-Id', bad)
+
+    def test_staff_flag_and_profile_pages(self):
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        response = self.client.get(reverse('registration_index'), {'_profile': 'mem'})
+        profile_id = response['X-Profile-Id']
+
+        listing = self.client.get(reverse('profile_list'))
+        self.assertEqual([p['id'] for p in listing.context['profiles']], [profile_id])
+        self.assertEqual(listing.context['profiles'][0]['view'], 'registration_index')
+
+        summary = self.client.get(reverse('profile_detail', args=[profile_id])).content.decode()
+        self.assertIn('function calls', summary)
+        self.assertIn('Top memory allocations', summary)
+        self.assertEqual(self.client.get(reverse('profile_detail', args=['not-a-profile'])).status_code, 404)
+
+
+class SlowQueryLogTests(TestCase):
+    def test_normalize_sql_groups_similar_queries(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            normalize_sql("SELECT * FROM t WHERE id IN (%s) AND name = 'y' LIMIT 10"),
+        )
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_logged_with_view_and_frame(self):
+        create_team('leader@example.com', 'John Smith', 'Jane Doe')
+        with self.assertLogs('registrations.slow_queries', 'WARNING') as logs:
+            self.client.get(reverse('export_csv'))
+        entries = [json.loads(line.split(':', 2)[2]) for line in logs.output]
+        member_query = next(e for e in entries if 'registrations_teammember' in e['sql'])
+        self.assertEqual(member_query['view'], 'export_csv')
+        self.assertTrue(member_query['frame'].startswith('registrations/'))
+        self.assertNotIn('leader@example.com', json.dumps(entries))
+
+    def test_report_ranks_fingerprints(self):
+        entries = [
+            {'duration_ms': 50, 'fingerprint': 'aaa', 'sql': 'SELECT a', 'params': 'int', 'view': 'export_csv', 'frame': 'f'},
+            {'duration_ms': 900, 'fingerprint': 'bbb', 'sql': 'SELECT b', 'params': 'int', 'view': 'admin_dashboard', 'frame': 'g'},
+            {'duration_ms': 60, 'fingerprint': 'aaa', 'sql': 'SELECT a', 'params': 'int', 'view': 'export_csv', 'frame': 'f'},
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as log:
+            log.write('\n'.join(json.dumps(entry) for entry in entries))
+        self.addCleanup(lambda: Path(log.name).unlink())
+        out = io.StringIO()
+        call_command('slow_query_report', log=log.name, stdout=out)
+        report = out.getvalue()
+        self.assertLess(report.index('bbb'), report.index('aaa'))
+        self.assertIn('2 calls', report)
+
+
+class CompressionTests(TestCase):
+    def setUp(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        create_team('leader@example.com', 'John Smith', 'Jane Doe')
+
+    def test_accept_encoding_respects_quality(self):
+        self.assertEqual(encoding_qualities('gzip;q=1.0, br;q=0, identity'), {'gzip': 1.0, 'br': 0.0, 'identity': 1.0})
+        levels = {'br': 5, 'gzip': 6}
+        self.assertEqual(choose_encoding('gzip;q=1, br;q=0.1', levels), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, *', levels), 'gzip')
+        self.assertIsNone(choose_encoding('gzip;q=0, br;q=0, *;q=1', levels))
+        self.assertIsNone(choose_encoding('identity', levels))
+        if brotli is not None:
+            self.assertEqual(choose_encoding('gzip, br', levels), 'br')
+            self.assertEqual(choose_encoding('*', levels), 'br')
+
+    def test_dashboard_compressed_with_preferred_encoding(self):
+        plain = self.client.get(reverse('admin_dashboard'))
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        zipped = self.client.get(reverse('admin_dashboard'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertIn(b'leader@example.com', gzip.decompress(zipped.content))
+        self.assertEqual(int(zipped['Content-Length']), len(zipped.content))
+        # BREACH: a random file name in the gzip header pads the length
+        self.assertTrue(zipped.content[3] & 0x08)
+
+        if brotli is not None:
+            response = self.client.get(reverse('admin_dashboard'), HTTP_ACCEPT_ENCODING='gzip, br')
+            self.assertEqual(response['Content-Encoding'], 'br')
+            html = brotli.decompress(response.content)
+            self.assertIn(b'leader@example.com', html)
+            self.assertRegex(html, rb'<!-- [A-Za-z]+ -->$')
+
+    def test_small_and_unlisted_responses_untouched(self):
+        response = self.client.get(reverse('validate_email'), {'email': 'new@example.com'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/static/registrations/script.js', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotEqual(response.get('Content-Encoding'), 'gzip')
+
+    def test_file_download_left_to_sendfile(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        self.enterContext(override_settings(EXPORT_SPOOL_DIR=spool.name))
+        with self.captureOnCommitCallbacks(execute=False):
+            job = self.client.post(reverse('start_export_job')).json()
+        run_export_job(job['id'])
+        response = self.client.get(reverse('export_job_download', args=[job['id']]), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'John Smith, Jane Doe', b''.join(response.streaming_content))
+
+        # The file object itself reaches the server's wsgi.file_wrapper
+        download = FileResponse(io.BytesIO(b'x' * 1000), content_type='text/csv')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIs(CompressionMiddleware(lambda request: download)(request).file_to_stream, download.file_to_stream)
+
+    def test_streaming_response_compressed(self):
+        request = RequestFactory().get('/registration/export/', HTTP_ACCEPT_ENCODING='gzip')
+        rows = [f'team{i}@example.com,health\n'.encode() for i in range(100)]
+        middleware = CompressionMiddleware(lambda request: StreamingHttpResponse(iter(rows), content_type='text/csv'))
+        response = middleware(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b''.join(rows))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    """Under the test runner 'replica1' is a separate SQLite database that
+    nothing replicates into (see settings.TESTING), so each read shows which
+    database served it"""
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        # Replicate the staff user and their session
+        for model in (User, Session):
+            model.objects.using('replica1').bulk_create(model.objects.using('default'))
+        Registration.objects.using('replica1').create(
+            team_leader_email='replica@example.com', project_field='health', project_category='prototype'
+        )
+
+    def test_dashboard_and_export_read_replica(self):
+        self.assertContains(self.client.get(reverse('admin_dashboard')), 'replica@example.com')
+        self.assertIn(b'replica@example.com', self.client.get(reverse('export_csv')).content)
+
+    def test_email_check_reads_primary(self):
+        response = self.client.get(reverse('validate_email'), {'email': 'replica@example.com'})
+        self.assertEqual(response.json()['exists'], False)
+
+    def test_write_pins_client_to_primary(self):
+        response = self.client.post(reverse('registration_index'), {
+            'team_leader_email': 'primary@example.com',
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+        })
+        self.assertTrue(Registration.objects.using('default').filter(team_leader_email='primary@example.com').exists())
+        self.assertFalse(Registration.objects.using('replica1').filter(team_leader_email='primary@example.com').exists())
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        dashboard = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(dashboard, 'primary@example.com')
+        self.assertNotContains(dashboard, 'replica@example.com')
+
+        self.client.cookies.pop(PIN_COOKIE)
+        self.assertContains(self.client.get(reverse('admin_dashboard')), 'replica@example.com')
+
+    def test_commands_use_primary(self):
+        self.assertFalse(Registration.objects.filter(team_leader_email='replica@example.com').exists())
+
+
+class StructuredLoggingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_json_formatter_includes_extra_fields(self):
+        record = logging.LogRecord('registrations.views', logging.INFO, __file__, 1, 'Registration %s', ('created',), None)
+        record.registration_id = 7
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['message'], 'Registration created')
+        self.assertEqual(entry['registration_id'], 7)
+        self.assertEqual(entry['level'], 'INFO')
+
+    def test_sampling_keeps_warnings(self):
+        sampler = SamplingFilter(rate=0)
+        info = logging.LogRecord('x', logging.INFO, __file__, 1, 'info', None, None)
+        warning = logging.LogRecord('x', logging.WARNING, __file__, 1, 'warning', None, None)
+        self.assertFalse(sampler.filter(info))
+        self.assertTrue(sampler.filter(warning))
+
+    def test_handler_writes_in_background_and_drops_when_full(self):
+        stream = io.StringIO()
+        handler = NonBlockingStreamHandler(stream, maxsize=1)
+        handler.setFormatter(JsonFormatter())
+        handler.listener.stop()
+        record = logging.LogRecord('x', logging.INFO, __file__, 1, 'queued', None, None)
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(handler.dropped, 1)
+        self.assertEqual(stream.getvalue(), '')
+
+        handler.listener.start()
+        handler.close()
+        self.assertEqual(json.loads(stream.getvalue())['message'], 'queued')
+
+    def test_submission_logs_without_personal_data(self):
+        data = {
+            'team_leader_email': 'leader@example.com',
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+        }
+        with mock.patch('builtins.print') as printed, self.assertLogs('registrations.views', 'DEBUG') as logs:
+            self.client.post(reverse('registration_index'), data)
+        printed.assert_not_called()
+        created = next(record for record in logs.records if record.getMessage() == 'Registration created')
+        self.assertEqual(created.members, 2)
+        output = ' '.join(json.dumps(vars(record), default=str) for record in logs.records)
+        self.assertNotIn('leader@example.com', output)
+        self.assertNotIn('John Smith', output)
+
+
+class TeamMemberForeignKeyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_member_reads_do_not_join(self):
+        registration = create_team('leader@example.com', 'John Smith', 'Jane Doe')
+        with CaptureQueriesContext(connection) as ctx:
+            names = [member.name for member in Registration.objects.prefetch_related('members')[0].members.all()]
+        self.assertEqual(names, ['John Smith', 'Jane Doe'])
+        self.assertEqual(len(ctx), 2)
+        self.assertNotIn('JOIN', ctx.captured_queries[1]['sql'])
+
+    def test_submission_inserts_members_once(self):
+        data = {
+            'team_leader_email': 'leader@example.com',
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'member3_name': 'Omar Khalil', 'member3_level': 'phd',
+            'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('registration_index'), data)
+        member_inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "registrations_teammember"')]
+        self.assertEqual(len(member_inserts), 1)
+        registration = Registration.objects.get(team_leader_email='leader@example.com')
+        self.assertEqual([m.order for m in registration.members.all()], [1, 2, 3])
+
+
+class GenerateRegistrationsTests(TestCase):
+    def generate(self, **options):
+        call_command('generate_registrations', 30, seed=7, stdout=io.StringIO(), **options)
+        return list(TeamMember.objects.order_by('registration__team_leader_email', 'order').values_list(
+            'registration__team_leader_email', 'registration__project_field',
+            'registration__registration_date', 'name', 'level',
+        ))
+
+    def test_seed_reproduces_rows_regardless_of_chunk_size(self):
+        rows = self.generate(chunk_size=4)
+        Registration.objects.all().delete()
+        self.assertEqual(rows, self.generate(chunk_size=100))
+
+        sizes = Registration.objects.annotate(size=Count('members')).values_list('size', flat=True)
+        self.assertEqual(len(sizes), 30)
+        self.assertTrue(all(2 <= size <= 5 for size in sizes))
+        # Members are searchable once the command has rebuilt the index
+        email, name = rows[0][0], rows[0][3]
+        self.assertIn(email, search_registrations(Registration.objects.all(), name).values_list('team_leader_email', flat=True))
+
+    def test_rerun_with_same_seed_is_refused(self):
+        call_command('generate_registrations', 5, seed=1, stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            call_command('generate_registrations', 5, seed=1, stdout=io.StringIO())
+        call_command('generate_registrations', 5, seed=1, offset=5, stdout=io.StringIO())
+        self.assertEqual(Registration.objects.count(), 10)
+
+
+BENCHMARK_BASELINES = Path(__file__).with_name('benchmark_baselines.json')
+# Absolute allowance on top of the relative tolerance, so millisecond-scale
+# timings are not failed by scheduler noise
+BENCHMARK_TIME_SLACK = 0.01
+BENCHMARK_SIZES = [int(size) for size in os.environ.get('BENCHMARK_SIZES', '').split(',') if size]
+
+
+def measure(func, repeat=5):
+    """Best wall time of `repeat` runs, queries of the last run and the
+    median peak traced allocation of `repeat` further runs. Garbage is
+    collected before each run, so leftovers of earlier runs and the
+    collector's timing do not move the time or the peak."""
+    timings = []
+    for _ in range(repeat):
+        cache.clear()
+        gc.collect()
+        reset_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        queries = len(ctx)
+    peaks = []
+    for _ in range(repeat):
+        cache.clear()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return {'seconds': round(min(timings), 4), 'queries': queries, 'peak_kb': round(statistics.median(peaks) / 1024)}
+
+
+@skipUnless(BENCHMARK_SIZES, 'set BENCHMARK_SIZES=1000,10000,100000 to run the benchmarks')
+class BenchmarkTests(TestCase):
+    """Export, dashboard and submission cost at growing table sizes.
+
+    Results are compared with benchmark_baselines.json: a benchmark fails
+    when it runs more queries than its baseline, or when its time or peak
+    memory exceeds the baseline by more than BENCHMARK_TOLERANCE (default
+    0.25), and the failure message shows the measurement next to the
+    baseline. Baselines are machine specific; run with BENCHMARK_UPDATE=1 to
+    record new ones.
+    """
+
+    def setUp(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+        self.submissions = 0
+
+    def submit(self):
+        self.submissions += 1
+        self.client.post(reverse('registration_index'), {
+            'team_leader_email': f'bench{self.submissions}@example.com',
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'member3_name': 'Omar Khalil', 'member3_level': 'phd',
+            'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+        })
+
+    def test_benchmarks(self):
+        baselines = json.loads(BENCHMARK_BASELINES.read_text()) if BENCHMARK_BASELINES.exists() else {}
+        tolerance = float(os.environ.get('BENCHMARK_TOLERANCE', '0.25'))
+        benchmarks = {
+            'export_to_csv': Registration.export_to_csv,
+            'export_csv_view': lambda: b''.join(self.client.get(reverse('export_csv'))),
+            'admin_dashboard': lambda: self.client.get(reverse('admin_dashboard')).content,
+            'submission': self.submit,
+        }
+        results = {}
+        loaded = 0
+        for size in sorted(BENCHMARK_SIZES):
+            call_command('generate_registrations', size - loaded, seed=0, offset=loaded, stdout=io.StringIO())
+            loaded = size
+            for name, func in benchmarks.items():
+                key = f'{name}@{size}'
+                results[key] = result = measure(func)
+                baseline = baselines.get(key)
+                if baseline is None or os.environ.get('BENCHMARK_UPDATE'):
+                    continue
+                report = f'{key}: measured {result}, baseline {baseline}'
+                with self.subTest(key):
+                    self.assertLessEqual(result['queries'], baseline['queries'], f'runs more queries; {report}')
+                    allowed = baseline['seconds'] * (1 + tolerance) + BENCHMARK_TIME_SLACK
+                    self.assertLessEqual(result['seconds'], allowed, f'got slower; {report}')
+                    self.assertLessEqual(result['peak_kb'], baseline['peak_kb'] * (1 + tolerance), f'uses more memory; {report}')
+        if os.environ.get('BENCHMARK_UPDATE'):
+            baselines.update(results)
+            BENCHMARK_BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+
+
+class DuplicateMemberTests(TestCase):
+    def test_name_key_ignores_case_spacing_and_punctuation(self):
+        self.assertEqual(normalize_name("  Jean-Luc  O'Brien "), normalize_name('jean luc obrien'))
+        self.assertEqual(normalize_name('José'), 'jose')
+
+    def test_key_kept_up_to_date(self):
+        registration = create_team('leader@example.com', 'John Smith')
+        member = registration.members.get()
+        self.assertEqual(member.name_key, 'johnsmith')
+        member.name = 'Jon Smith'
+        member.save(update_fields=['name'])
+        member.refresh_from_db()
+        self.assertEqual(member.name_key, 'jonsmith')
+
+    def test_report_groups_members_across_teams(self):
+        first = create_team('first@example.com', 'John Smith', 'Jane Doe')
+        create_team('second@example.com', 'john  smith', 'Omar Khalil')
+        create_team('third@example.com', 'John-Smith', 'Sara Adel')
+        create_team('fourth@example.com', 'Jane Doe', 'Nour Hassan')
+        with self.assertNumQueries(2):
+            report = duplicate_report()
+        self.assertEqual([(group['name_key'], group['teams']) for group in report], [('johnsmith', 3), ('janedoe', 2)])
+        self.assertEqual(report[0]['members'][0].registration, first)
+
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        response = self.client.get(reverse('duplicate_members'))
+        self.assertContains(response, 'third@example.com')
+        self.assertEqual(response.context['total_groups'], 2)
+
+    @override_settings(CURRENT_SEASON=2026)
+    def test_same_student_in_different_seasons_is_not_a_duplicate(self):
+        create_team('leader@example.com', 'John Smith', 'Jane Doe')
+        Registration.objects.update(season=2025)
+        create_team('leader@example.com', 'John Smith', 'Omar Khalil')
+        self.assertEqual(duplicate_report(), [])
+        create_team('other@example.com', 'Omar Khalil')
+        self.assertEqual([(group['name_key'], group['teams']) for group in duplicate_report()], [('omarkhalil', 2)])
+        self.assertEqual(list(duplicate_groups(season=2025)), [])
+
+        out = io.StringIO()
+        call_command('duplicate_members', season=2025, stdout=out)
+        self.assertIn('No duplicate members found', out.getvalue())
+
+
+class PurgeTests(TestCase):
+    def test_orphans_collected_in_batches(self):
+        registration = create_team('leader@example.com', 'John Smith')
+        TeamMember.objects.bulk_create([TeamMember(name=f'Orphan {i}', level='bachelor') for i in range(5)])
+        out = io.StringIO()
+        call_command('collect_orphan_members', batch_size=2, stdout=out)
+        self.assertIn('Removed 5 orphaned members', out.getvalue())
+        self.assertEqual(list(TeamMember.objects.values_list('registration', flat=True)), [registration.pk])
+
+    def test_purge_removes_teams_and_search_rows(self):
+        for i in range(3):
+            create_team(f'team{i}@example.com', 'John Smith', 'Jane Doe')
+        out = io.StringIO()
+        call_command('purge_registrations', interactive=False, batch_size=2, stdout=out)
+        self.assertIn('Removed 3 registrations and 6 members', out.getvalue())
+        self.assertFalse(Registration.objects.exists() or TeamMember.objects.exists())
+        if uses_fts(connection):
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE}')
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_purge_reports_deleted_teams(self):
+        teams = [create_team(f'team{i}@example.com', 'John Smith') for i in range(3)]
+        TeamMember.objects.bulk_create([TeamMember(name='Orphan', level='bachelor')])
+        cursor = RegistrationEvent.objects.latest('pk').pk
+        call_command('purge_registrations', interactive=False, batch_size=2, stdout=io.StringIO())
+        events = RegistrationEvent.objects.filter(pk__gt=cursor).order_by('pk')
+        self.assertEqual([(event.kind, event.registration_id) for event in events],
+                         [(RegistrationEvent.KIND_DELETED, team.pk) for team in teams])
+        self.assertEqual(events[0].payload, {'id': teams[0].pk, 'team_leader_email': 'team0@example.com',
+                                             'season': teams[0].season, 'purged': True})
+        self.assertFalse(TeamMember.objects.exists())
+
+    def test_truncate_only_when_nothing_else_references_teams(self):
+        # The outbox's foreign key to Registration would make TRUNCATE fail
+        self.assertIsNone(truncate_tables())
+        with mock.patch.object(OutboxEmail._meta.get_field('registration'), 'db_constraint', False):
+            self.assertEqual(truncate_tables(), [TeamMember._meta.db_table, Registration._meta.db_table])
+
+    def test_purge_keeps_queued_emails(self):
+        registration = create_team('leader@example.com', 'John Smith')
+        queue_confirmation(registration, list(registration.members.all()))
+        call_command('purge_registrations', interactive=False, stdout=io.StringIO())
+        self.assertEqual(list(OutboxEmail.objects.values_list('registration', 'to_email')), [(None, 'leader@example.com')])
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_MAX_ATTEMPTS=3, OUTBOX_RETRY_BASE_SECONDS=60, OUTBOX_RETRY_MAX_SECONDS=3600,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def queue(self, count):
+        for i in range(count):
+            registration = create_team(f'team{i}@example.com', 'John Smith', 'Jane Doe')
+            queue_confirmation(registration, list(registration.members.all()))
+
+    def test_submission_queues_confirmation(self):
+        data = {
+            'team_leader_email': 'leader@example.com',
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+        }
+        self.client.post(reverse('registration_index'), data)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual((email.to_email, email.status), ('leader@example.com', OutboxEmail.STATUS_PENDING))
+        self.assertEqual(email.registration.team_leader_email, 'leader@example.com')
+        self.assertIn('Jane Doe', email.body)
+
+    def test_failed_submission_queues_nothing(self):
+        with mock.patch('registrations.views.queue_confirmation', side_effect=RuntimeError('boom')):
+            self.client.post(reverse('registration_index'), {
+                'team_leader_email': 'leader@example.com',
+                'member1_name': 'John Smith', 'member1_level': 'bachelor',
+                'member2_name': 'Jane Doe', 'member2_level': 'master',
+                'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+            })
+        self.assertFalse(Registration.objects.exists() or OutboxEmail.objects.exists())
+
+    def test_batches_share_one_connection(self):
+        self.queue(5)
+        with mock.patch('registrations.outbox.get_connection', wraps=mail.get_connection) as get_connection:
+            out = io.StringIO()
+            call_command('send_outbox', batch_size=3, stdout=out)
+        self.assertEqual(get_connection.call_count, 2)
+        self.assertIn('Sent 5 emails, 0 failed', out.getvalue())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f'team{i}@example.com' for i in range(5)])
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.STATUS_SENT).exists())
+        self.assertEqual(send_pending(), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        self.queue(2)
+        rejected = 'team1@example.com'
+        original = mail.get_connection
+
+        def flaky_connection():
+            connection = original()
+            send = connection.send_messages
+
+            def send_messages(messages):
+                if messages[0].to == [rejected]:
+                    raise OSError('mailbox unavailable')
+                return send(messages)
+            connection.send_messages = send_messages
+            return connection
+
+        with mock.patch('registrations.outbox.get_connection', flaky_connection):
+            self.assertEqual(send_pending(), (1, 1))
+            email = OutboxEmail.objects.get(to_email=rejected)
+            self.assertEqual((email.status, email.attempts, email.last_error), ('pending', 1, 'mailbox unavailable'))
+            self.assertGreater(email.next_attempt_at, timezone.now() + timedelta(seconds=50))
+            # Not due yet
+            self.assertEqual(send_pending(), (0, 0))
+            for _ in range(2):
+                OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+                self.assertEqual(send_pending(), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboxEmail.STATUS_FAILED, 3))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_purge_keeps_queued_emails(self):
+        self.queue(2)
+        call_command('purge_registrations', interactive=False, stdout=io.StringIO())
+        self.assertEqual(send_pending(), (2, 0))
+
+
+@override_settings(EVENTS_API_TOKEN='feed-token', EVENTS_MAX_WAIT=2)
+class EventFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.auth = {'HTTP_AUTHORIZATION': 'Bearer feed-token'}
+
+    def feed(self, **params):
+        response = self.client.get(reverse('registration_events'), params, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changes_are_recorded_with_the_team(self):
+        registration = create_team('leader@example.com', 'John Smith', 'Jane Doe')
+        member = registration.members.get(order=2)
+        member.name = 'Jane Smith'
+        member.save()
+        registration.delete()
+        kinds = list(RegistrationEvent.objects.values_list('kind', flat=True))
+        self.assertEqual(kinds, ['created', 'updated', 'deleted'])
+        created, renamed = [event.payload for event in RegistrationEvent.objects.all()[:2]]
+        self.assertEqual([m['name'] for m in created['members']], ['John Smith', 'Jane Doe'])
+        self.assertEqual([m['name'] for m in renamed['members']], ['John Smith', 'Jane Smith'])
+        self.assertEqual(RegistrationEvent.objects.last().payload['team_leader_email'], 'leader@example.com')
+
+    def test_submission_records_one_complete_event(self):
+        self.client.post(reverse('registration_index'), {
+            'team_leader_email': 'leader@example.com',
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'project_field': 'energy', 'project_category': 'prototype', 'accept_terms': 'on',
+        })
+        [event] = self.feed()['events']
+        self.assertEqual(event['kind'], 'created')
+        self.assertEqual([(m['name'], m['level']) for m in event['payload']['members']],
+                         [('John Smith', 'bachelor'), ('Jane Doe', 'master')])
+
+    def test_cursor_pages_through_new_events_only(self):
+        for i in range(3):
+            create_team(f'team{i}@example.com', 'John Smith')
+        first = self.feed(limit=2)
+        self.assertEqual(len(first['events']), 2)
+        self.assertTrue(first['has_more'])
+        rest = self.feed(cursor=first['cursor'])
+        self.assertEqual(len(rest['events']), 1)
+        self.assertFalse(rest['has_more'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            empty = self.feed(cursor=rest['cursor'])
+        self.assertEqual((empty['events'], empty['cursor']), ([], rest['cursor']))
+        # After looking up the cursor event's position, a range over the newer rows
+        sql = [q['sql'] for q in ctx.captured_queries if 'registrationevent' in q['sql']][-1]
+        self.assertIn('"id" >', sql)
+
+    def test_events_follow_commit_order(self):
+        # Event 1 was written by a transaction that committed after event 2's
+        first = RegistrationEvent.objects.create(kind='deleted', registration_id=1, payload={}, transaction_id=20)
+        second = RegistrationEvent.objects.create(kind='deleted', registration_id=2, payload={}, transaction_id=10)
+        page = self.feed(limit=1)
+        self.assertEqual([event['id'] for event in page['events']], [second.pk])
+        self.assertEqual([event['id'] for event in self.feed(cursor=page['cursor'])['events']], [first.pk])
+
+    def test_long_poll_returns_when_events_arrive(self):
+        cursor = self.feed()['cursor']
+        # The team registers while the request is waiting
+        with mock.patch('registrations.events.time.sleep', side_effect=lambda seconds: create_team('late@example.com', 'John Smith')):
+            events = self.feed(cursor=cursor, wait=30)['events']
+        self.assertEqual([event['payload']['team_leader_email'] for event in events], ['late@example.com'])
+
+    def test_long_poll_gives_up_after_max_wait(self):
+        with mock.patch('registrations.events.time.monotonic', side_effect=[0, 1, 2.5]), \
+                mock.patch('registrations.events.time.sleep') as sleep:
+            self.assertEqual(self.feed(wait=60)['events'], [])
+        self.assertEqual(sleep.call_count, 1)
+
+    def test_requires_token_or_staff(self):
+        self.auth = {'HTTP_AUTHORIZATION': 'Bearer wrong'}
+        self.assertEqual(self.client.get(reverse('registration_events'), **self.auth).status_code, 403)
+        self.assertEqual(self.client.get(reverse('registration_events')).status_code, 403)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_snapshot()
+        self.addCleanup(reset_snapshot)
+        create_team('health@example.com', 'John Smith', 'Jane Doe', project_field='health')
+        create_team('energy@example.com', 'Omar Khalil', project_field='energy', project_category='prototype')
+
+    def test_dashboard_sees_writes_from_other_workers(self):
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).context['total_registrations'], 2)
+        # Another worker's writes invalidate nothing in this process
+        Registration.objects.bulk_create([
+            Registration(team_leader_email=f'other{i}@example.com', project_field='health', project_category='prototype')
+            for i in range(10)
+        ])
+        response = self.client.get(reverse('admin_dashboard'), {'page': 2})
+        self.assertEqual(response.context['total_registrations'], 12)
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_stats_match_the_database(self):
+        TeamMember.objects.filter(name='Jane Doe').update(level='master')
+        stats = RegistrationSnapshot.load().stats()
+        self.assertEqual((stats['total_registrations'], stats['total_members']), (2, 3))
+        self.assertEqual(dict(stats['by_field']), {'Health': 1, 'Energy': 1, 'Environment': 0})
+        self.assertEqual(dict(stats['by_level'])['Graduate Studies (Master)'], 1)
+        filtered = RegistrationSnapshot.load().stats(project_category='prototype')
+        self.assertEqual((filtered['total_registrations'], filtered['total_members']), (1, 1))
+
+    def test_date_filters(self):
+        Registration.objects.filter(team_leader_email='energy@example.com').update(
+            registration_date=timezone.now() - timedelta(days=10)
+        )
+        snapshot = RegistrationSnapshot.load()
+        recent = snapshot.stats(date_from=timezone.now() - timedelta(days=1))
+        self.assertEqual(dict(recent['by_field']), {'Health': 1, 'Energy': 0, 'Environment': 0})
+        self.assertEqual(snapshot.stats(date_to=timezone.now() - timedelta(days=5))['total_members'], 1)
+
+        # Whole-day filters from the dashboard form add up the per-day totals
+        today = timezone.localdate()
+        filters = RegistrationFilterForm({'date_from': today - timedelta(days=10), 'date_to': today - timedelta(days=1)}).as_filters()
+        with mock.patch.object(RegistrationSnapshot, '_scan', side_effect=AssertionError('scanned')):
+            self.assertEqual(dict(snapshot.stats(**filters)['by_field']), {'Health': 0, 'Energy': 1, 'Environment': 0})
+
+    def test_refresh_patches_changed_teams(self):
+        snapshot_stats()
+        with CaptureQueriesContext(connection) as ctx:
+            snapshot_stats()
+        # Only the version lookup when nothing changed
+        self.assertEqual(len(ctx), 1)
+        self.assertIn('registrations_registrationversion', ctx.captured_queries[0]['sql'])
+
+        registration = Registration.objects.get(team_leader_email='energy@example.com')
+        registration.project_field = 'environment'
+        registration.save()
+        create_team('new@example.com', 'Sara Adel', 'Nour Hassan', 'Aya Ali')
+        with mock.patch.object(RegistrationSnapshot, 'load', side_effect=AssertionError('rebuilt')):
+            stats = snapshot_stats()
+        self.assertEqual(dict(stats['by_field']), {'Health': 2, 'Energy': 0, 'Environment': 1})
+        self.assertEqual(stats['total_members'], 6)
+
+        registration.delete()
+        self.assertEqual(snapshot_stats()['total_registrations'], 2)
+
+    def test_footprint_per_100k(self):
+        snapshot = RegistrationSnapshot()
+        registered = timezone.now()
+        for pk in range(1, 100001):
+            snapshot._insert(pk - 1, (pk, 'health', 'prototype', registered))
+        # 14 bytes a team plus the arrays' growth headroom
+        self.assertLess(snapshot.nbytes(), 1.6 * 1024 * 1024)
+
+
+@override_settings(CURRENT_SEASON=2026)
+class QuotaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        CapacityQuota.objects.create(season=2026, dimension='project_category', value='prototype', limit=2)
+        CapacityQuota.objects.create(season=2026, dimension='project_field', value='energy', limit=10)
+
+    def submit(self, email, field='energy', category='prototype'):
+        return self.client.post(reverse('registration_index'), {
+            'team_leader_email': email,
+            'member1_name': 'John Smith', 'member1_level': 'bachelor',
+            'member2_name': 'Jane Doe', 'member2_level': 'master',
+            'project_field': field, 'project_category': category, 'accept_terms': 'on',
+        })
+
+    def used(self):
+        return dict(CapacityQuota.objects.values_list('value', 'used'))
+
+    def test_counters_follow_registrations(self):
+        self.submit('one@example.com')
+        self.submit('two@example.com', category='student_research')
+        self.assertEqual(self.used(), {'prototype': 1, 'energy': 2})
+        registration = Registration.objects.get(team_leader_email='two@example.com')
+        registration.project_category = 'prototype'
+        registration.project_field = 'health'
+        registration.save()
+        self.assertEqual(self.used(), {'prototype': 2, 'energy': 1})
+        registration.delete()
+        self.assertEqual(self.used(), {'prototype': 1, 'energy': 1})
+
+    def test_full_category_rejected_from_cache(self):
+        self.submit('one@example.com')
+        self.submit('two@example.com')
+        self.assertEqual(remaining_capacity('project_category', 'prototype'), 0)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.submit('three@example.com')
+        self.assertContains(response, 'The Prototype project category is full')
+        self.assertFalse(any('capacityquota' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(Registration.objects.count(), 2)
+
+    def test_transaction_check_when_cache_is_stale(self):
+        self.submit('one@example.com')
+        remaining_capacity('project_category', 'prototype')
+        # Another worker filled the quota after this one cached the counters
+        CapacityQuota.objects.filter(value='prototype').update(used=2)
+        response = self.submit('two@example.com')
+        self.assertContains(response, 'is full')
+        self.assertFalse(Registration.objects.filter(team_leader_email='two@example.com').exists())
+        self.assertEqual(self.used(), {'prototype': 2, 'energy': 1})
+        with self.assertRaises(QuotaFull):
+            reserve_places('health', 'prototype')
+
+    def test_quota_created_in_another_worker_is_enforced(self):
+        remaining_capacity('project_field', 'health')
+        # Created elsewhere: nothing invalidates this process's cached counters
+        CapacityQuota.objects.bulk_create([CapacityQuota(season=2026, dimension='project_field', value='health', limit=1)])
+        self.submit('one@example.com', field='health', category='student_research')
+        self.assertEqual(self.used()['health'], 1)
+        response = self.submit('two@example.com', field='health', category='student_research')
+        self.assertContains(response, 'The Health project field is full')
+        self.assertEqual(self.used()['health'], 1)
+
+    def test_form_shows_remaining_places(self):
+        self.submit('one@example.com')
+        self.submit('two@example.com')
+        response = self.client.get(reverse('registration_index'))
+        self.assertContains(response, 'Prototype (full)')
+        self.assertContains(response, 'Energy (8 places left)')
+        self.assertContains(response, '<span>Health</span>', html=True)
+
+    def test_editing_limit_keeps_counter(self):
+        quota = CapacityQuota.objects.get(value='energy')
+        self.submit('one@example.com')
+        quota.limit = 20
+        quota.save()
+        self.assertEqual(self.used()['energy'], 1)
+
+    def test_quota_added_mid_campaign_counts_existing_teams(self):
+        for email in ['one@example.com', 'two@example.com', 'three@example.com']:
+            self.submit(email, category='student_research')
+        quota = CapacityQuota.objects.create(season=2026, dimension='project_category', value='student_research', limit=2)
+        self.assertEqual(quota.used, 3)
+        self.assertEqual(remaining_capacity('project_category', 'student_research'), 0)
+        with self.assertRaises(QuotaFull):
+            reserve_places('energy', 'student_research')
+        response = self.submit('four@example.com', category='student_research')
+        self.assertContains(response, 'is full')
+        self.assertEqual(Registration.objects.count(), 3)
+
+    def test_moving_quota_recounts_it(self):
+        self.submit('one@example.com', field='health')
+        quota = CapacityQuota.objects.get(value='energy')
+        quota.value = 'health'
+        quota.save()
+        self.assertEqual(self.used()['health'], 1)
+        quota.season = 2025
+        quota.save()
+        self.assertEqual(self.used()['health'], 0)
+
+    def test_recount_after_bulk_load(self):
+        call_command('generate_registrations', 30, seed=3, stdout=io.StringIO())
+        expected = Registration.objects.filter(project_category='prototype').count()
+        self.assertEqual(self.used()['prototype'], expected)
+
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def buckets(self):
+        return set(HourlyRollup.objects.filter(teams__gt=0).values_list('hour', 'project_field', 'project_category', 'teams'))
+
+    def test_buckets_follow_registrations(self):
+        first = create_team('one@example.com', 'John Smith')
+        create_team('two@example.com', 'Jane Doe')
+        hour = bucket(first.registration_date)
+        self.assertEqual(self.buckets(), {(hour, 'health', 'student_research', 2)})
+
+        first.project_field = 'energy'
+        first.save()
+        earlier = hour - timedelta(hours=3)
+        Registration.objects.filter(team_leader_email='two@example.com').first().delete()
+        Registration.objects.create(team_leader_email='three@example.com', project_field='health',
+                                    project_category='prototype', accept_terms=True)
+        self.assertEqual(self.buckets(), {(hour, 'energy', 'student_research', 1), (hour, 'health', 'prototype', 1)})
+        # Moving a team to another hour (as back-dating in the admin would) moves its count
+        first.registration_date = earlier
+        first.save()
+        self.assertEqual(self.buckets(), {(earlier, 'energy', 'student_research', 1), (hour, 'health', 'prototype', 1)})
+
+        live = self.buckets()
+        self.assertEqual(rebuild_rollup(), 2)
+        self.assertEqual(self.buckets(), live)
+
+    def test_bulk_load_is_rolled_up(self):
+        call_command('generate_registrations', 40, seed=5, stdout=io.StringIO())
+        self.assertEqual(sum(HourlyRollup.objects.values_list('teams', flat=True)), 40)
+        live = self.buckets()
+        rebuild_rollup()
+        self.assertEqual(self.buckets(), live)
+
+    def test_endpoint_serves_zero_filled_hours(self):
+        create_team('one@example.com', 'John Smith')
+        create_team('two@example.com', 'Jane Doe', project_field='energy')
+        User.objects.create_user('staff', password='pw', is_staff=True)
+        self.client.login(username='staff', password='pw')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('hourly_registrations'), {'hours': 6})
+        self.assertFalse(any('registrations_registration' in q['sql'] for q in ctx.captured_queries))
+        data = response.json()
+        self.assertEqual(len(data['hours']), 6)
+        self.assertEqual(data['total'], 2)
+        latest = data['hours'][-1]
+        self.assertEqual(latest['hour'], bucket(timezone.now()).isoformat())
+        self.assertEqual((latest['by_field']['health'], latest['by_field']['energy']), (1, 1))
+        self.assertEqual(sum(entry['teams'] for entry in data['hours'][:-1]), 0)
+        self.assertIn('private', response['Cache-Control'])
+
+        data = self.client.get(reverse('hourly_registrations'), {'field': 'energy'}).json()
+        self.assertEqual((len(data['hours']), data['total']), (48, 1))
+        self.assertEqual(self.client.get(reverse('hourly_registrations'), {'field': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('hourly_registrations'), {'hours': 'x'}).status_code, 400)
+
+    def test_endpoint_requires_staff(self):
+        self.assertEqual(self.client.get(reverse('hourly_registrations')).status_code, 403)
+
+
+
+class StartupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_warm_up_primes_caches(self):
+        steps = warm_up()
+        self.assertEqual([(step, error) for step, _, error in steps],
+                         [('urls', None), ('templates', None), ('database', None), ('caches', None)])
+        self.assertIsNotNone(cache.get(quota_cache_key(settings.CURRENT_SEASON)))
+
+    def test_failing_step_does_not_stop_warm_up(self):
+        with mock.patch('registrations.warmup.get_template', side_effect=OSError('disk gone')):
+            steps = dict((step, error) for step, _, error in warm_up())
+        self.assertEqual(steps['templates'], 'disk gone')
+        self.assertIsNone(steps['caches'])
+
+    def test_migrate_skipped_when_up_to_date(self):
+        out = io.StringIO()
+        with mock.patch('registrations.management.commands.migrate_if_needed.call_command') as migrate:
+            call_command('migrate_if_needed', stdout=out)
+        migrate.assert_not_called()
+        self.assertIn('No migrations to apply', out.getvalue())
+
+    def test_gunicorn_threads_while_long_polling(self):
+        conf = Path(settings.BASE_DIR) / 'gunicorn.conf.py'
+        with mock.patch.dict(os.environ, {'EVENTS_MAX_WAIT': '20', 'GUNICORN_THREADS': '4'}):
+            options = runpy.run_path(str(conf))
+        self.assertEqual((options['worker_class'], options['threads']), ('gthread', 4))
+        with mock.patch.dict(os.environ, {'EVENTS_MAX_WAIT': '0'}):
+            self.assertNotIn('worker_class', runpy.run_path(str(conf)))
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |     django.utils\n'
+            'import time:      2500 |       2620 |   django\n'
+            'unrelated line\n'
+        )
+        self.assertEqual(parse_importtime(output), [('django.utils', 120, 120), ('django', 2500, 2620)])
+
+
+@override_settings(CURRENT_SEASON=2026)
+class SeasonArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_archive_moves_closed_season_in_batches(self):
+        old = [create_team(f'old{i}@example.com', 'John Smith', 'Jane Doe') for i in range(3)]
+        Registration.objects.update(season=2025)
+        create_team('old0@example.com', 'Omar Khalil')
+        out = io.StringIO()
+        call_command('archive_season', 2025, batch_size=2, stdout=out)
+
+        self.assertIn('2/3', out.getvalue())
+        self.assertEqual(list(Registration.objects.values_list('season', flat=True)), [2026])
+        self.assertEqual(TeamMember.objects.count(), 1)
+        archived = ArchivedRegistration.objects.get(pk=old[0].pk)
+        self.assertEqual((archived.team_leader_email, archived.season), ('old0@example.com', 2025))
+        self.assertEqual([m.name for m in archived.members.all()], ['John Smith', 'Jane Doe'])
+        self.assertEqual(ArchivedTeamMember.objects.count(), 6)
+        self.assertEqual(search_registrations(Registration.objects.all(), 'Smith').count(), 0)
+
+    def test_leader_can_register_each_season(self):
+        create_team('leader@example.com', 'John Smith')
+        Registration.objects.update(season=2025)
+        self.assertFalse(Registration.email_exists('leader@example.com'))
+        create_team('leader@example.com', 'John Smith')
+        self.assertTrue(Registration.email_exists('leader@example.com'))
+
+    def test_season_must_be_configured(self):
+        env = {key: value for key, value in os.environ.items() if key != 'CURRENT_SEASON'}
+        result = subprocess.run([sys.executable, '-c', 'import registration_system.settings'],
+                                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn('Environment variable CURRENT_SEASON is not set', result.stderr)
+
+    def test_open_season_is_refused(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_season', 2026, stdout=io.StringIO())
+
+
+class TeamMemberBackfillMigrationTests(TransactionTestCase):
+    before = [('registrations', '0003_search_indexes')]
+    after = [('registrations', '0004_teammember_registration_fk')]
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_backfill_from_through_table(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        OldRegistration = apps.get_model('registrations', 'Registration')
+        OldTeamMember = apps.get_model('registrations', 'TeamMember')
+
+        first = OldRegistration.objects.create(team_leader_email='a@example.com', project_field='health', project_category='prototype')
+        second = OldRegistration.objects.create(team_leader_email='b@example.com', project_field='energy', project_category='prototype')
+        own = OldTeamMember.objects.create(name='Own Member', level='bachelor', order=1)
+        shared = OldTeamMember.objects.create(name='Shared Member', level='master', order=2)
+        orphan = OldTeamMember.objects.create(name='Orphan Member', level='phd', order=1)
+        first.members.add(own, shared)
+        second.members.add(shared)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        NewTeamMember = executor.loader.project_state(self.after).apps.get_model('registrations', 'TeamMember')
+
+        self.assertEqual(NewTeamMember.objects.get(pk=own.pk).registration_id, first.pk)
+        self.assertIsNone(NewTeamMember.objects.get(pk=orphan.pk).registration_id)
+        shared_teams = NewTeamMember.objects.filter(name='Shared Member').values_list('registration_id', flat=True)
+        self.assertEqual(sorted(shared_teams), [first.pk, second.pk])
+
+
+class RollupBackfillMigrationTests(TransactionTestCase):
+    before = [('registrations', '0017_registrationversion')]
+    after = [('registrations', '0018_backfill_hourlyrollup')]
+
+    def tearDown(self):
+        MigrationExecutor(connection).migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_teams_registered_before_the_rollup_are_counted(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        OldRegistration = executor.loader.project_state(self.before).apps.get_model('registrations', 'Registration')
+        for i, category in enumerate(['prototype', 'prototype', 'student_research']):
+            OldRegistration.objects.create(team_leader_email=f'team{i}@example.com', season=2025,
+                                           project_field='health', project_category=category)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        rollup = executor.loader.project_state(self.after).apps.get_model('registrations', 'HourlyRollup')
+        self.assertEqual(dict(rollup.objects.values_list('project_category', 'teams')),
+                         {'prototype': 2, 'student_research': 1})
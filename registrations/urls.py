@@ -6,6 +6,14 @@ urlpatterns = [
     path('success/', views.registration_success, name='registration_success'),
     path('validate-email/', views.validate_email, name='validate_email'),
     path('export-csv/', views.export_csv, name='export_csv'),
+    path('export-jobs/', views.start_export_job, name='start_export_job'),
+    path('export-jobs/<uuid:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export-jobs/<uuid:job_id>/download/', views.export_job_download, name='export_job_download'),
+    path('events/', views.registration_events, name='registration_events'),
+    path('stats/hourly/', views.hourly_registrations, name='hourly_registrations'),
     path('admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin/duplicates/', views.duplicate_members, name='duplicate_members'),
+    path('admin/profiles/', views.profile_list, name='profile_list'),
+    path('admin/profiles/<str:name>/', views.profile_detail, name='profile_detail'),
     path('migrate/', views.migrate_database, name='migrate_database'),  # Emergency migration endpoint
 ]
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+Shared change marker for the live team tables.
+
+RegistrationVersion holds one counter. Every write to registrations or team
+members bumps it in the writing transaction: the registration and member
+signals, bulk inserts, archiving and purges. Readers that keep a copy of the
+tables (the dashboard snapshot, export ETags) read the counter, a single
+primary-key lookup, instead of aggregating the registration table, and only
+go back to the table when it moved. A bump commits or rolls back with the
+write it marks, so no worker can see the data change without the counter.
+"""
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import F
+
+from .models import RegistrationVersion
+
+VERSION_ROW = 1
+
+
+def bump_version(using=DEFAULT_DB_ALIAS):
+    """Record a write to the team tables; call in the writing transaction"""
+    rows = RegistrationVersion.objects.using(using).filter(pk=VERSION_ROW)
+    if rows.update(version=F('version') + 1):
+        return
+    try:
+        # Savepoint, so a conflict does not break the caller's transaction
+        with transaction.atomic(using=using):
+            RegistrationVersion.objects.using(using).create(pk=VERSION_ROW, version=1)
+    except IntegrityError:
+        # A concurrent write created the row after our update
+        rows.update(version=F('version') + 1)
+
+
+def registrations_version(using=None):
+    """The current counter; changes whenever a team is written"""
+    return RegistrationVersion.objects.using(using).filter(pk=VERSION_ROW).values_list('version', flat=True).first() or 0
@@ -1,14 +1,33 @@
-from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse
+from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+import hmac
 import json
-from django.core.paginator import Paginator
-from django.db import transaction
+import logging
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.conf import settings
 from django.contrib import messages
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 
-from .models import Registration, TeamMember
-from .forms import RegistrationForm
+from .duplicates import duplicate_groups, duplicate_report
+from .events import EVENTS_MAX_PAGE_SIZE, EVENTS_PAGE_SIZE, wait_for_events
+from .exports import EXPORT_HEADER, export_fingerprint, export_queryset, export_rows, get_or_start_export_job, spool_path
+from .models import ExportJob, Registration, TeamMember, current_season
+from .forms import RegistrationForm, RegistrationFilterForm
+from .outbox import queue_confirmation
+from .pagination import EstimatedCountPaginator
+from .profiling import list_profiles, profile_file
+from .quotas import QuotaFull, full_quota, remaining_capacity, reserve_places
+from .rollup import hourly_series
+from .routers import use_primary
+from .search import search_registrations
+from .snapshot import snapshot_stats
+
+logger = logging.getLogger(__name__)
 
 def index(request):
     """Main registration page"""
@@ -16,7 +35,20 @@ def index(request):
         return handle_registration_submission(request)
     
     form = RegistrationForm()
-    return render(request, 'registrations/index.html', {'form': form})
+    # Remaining places come from the cached quota counters
+    project_fields = [
+        (value, label, remaining_capacity('project_field', value))
+        for value, label in Registration.PROJECT_FIELD_CHOICES
+    ]
+    project_categories = [
+        (value, label, remaining_capacity('project_category', value))
+        for value, label in Registration.PROJECT_CATEGORY_CHOICES
+    ]
+    return render(request, 'registrations/index.html', {
+        'form': form,
+        'project_fields': project_fields,
+        'project_categories': project_categories,
+    })
 
 def migrate_database(request):
     """Emergency migration endpoint - remove after setup"""
@@ -30,9 +62,27 @@ def migrate_database(request):
     
     return JsonResponse({'status': 'info', 'message': 'POST to this endpoint to run migrations'})
 
+def _rejected_response(errors):
+    """Error page listing why a submission was refused"""
+    logger.info('Registration rejected', extra={'errors': errors})
+    return HttpResponse(f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; text-align: center; padding: 50px;">
+        <h2 style="color: #d32f2f;">Registration Failed</h2>
+        <div style="background: #ffebee; border: 1px solid #f8bbd9; padding: 20px; border-radius: 8px; margin: 20px;">
+            <h3>Please fix the following errors:</h3>
+            <ul style="text-align: left; display: inline-block;">
+                {''.join([f'<li>{error}</li>' for error in errors])}
+            </ul>
+        </div>
+        <button onclick="window.history.back()" style="background: #2196F3; color: white; border: none; padding: 10px 20px; border-radius: 5px; cursor: pointer;">Go Back</button>
+    </body>
+    </html>
+    """, content_type='text/html')
+
 def handle_registration_submission(request):
     """Handle form submission - simplified version"""
-    print(f"🔍 Form received: {dict(request.POST)}")
+    logger.debug('Registration form received', extra={'fields': sorted(request.POST.keys())})
     
     # Manual form validation
     errors = []
@@ -43,7 +93,7 @@ def handle_registration_submission(request):
         errors.append('Email address is required')
     elif '@' not in email:
         errors.append('Please enter a valid email address')
-    elif Registration.objects.filter(team_leader_email=email).exists():
+    elif Registration.email_exists(email):
         errors.append('This email is already registered in the system')
     
     # Validate required members (1 & 2)
@@ -74,55 +124,52 @@ def handle_registration_submission(request):
             if not re.match(english_pattern, name):
                 errors.append(f'Member {i} name must contain only English letters')
     
+    # Full quotas are turned away from the cached counters, without a transaction
+    if request.POST.get('project_field') and request.POST.get('project_category'):
+        full = full_quota(request.POST['project_field'], request.POST['project_category'])
+        if full:
+            errors.append(str(QuotaFull(*full)))
+    
     # If there are errors, show them
     if errors:
-        print(f"❌ Validation errors: {errors}")
-        error_message = '<br>'.join(errors)
-        return HttpResponse(f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; text-align: center; padding: 50px;">
-            <h2 style="color: #d32f2f;">Registration Failed</h2>
-            <div style="background: #ffebee; border: 1px solid #f8bbd9; padding: 20px; border-radius: 8px; margin: 20px;">
-                <h3>Please fix the following errors:</h3>
-                <ul style="text-align: left; display: inline-block;">
-                    {''.join([f'<li>{error}</li>' for error in errors])}
-                </ul>
-            </div>
-            <button onclick="window.history.back()" style="background: #2196F3; color: white; border: none; padding: 10px 20px; border-radius: 5px; cursor: pointer;">Go Back</button>
-        </body>
-        </html>
-        """, content_type='text/html')
+        return _rejected_response(errors)
     
     # If validation passes, save to database
     try:
         with transaction.atomic():
-            # Create registration record
-            registration = Registration.objects.create(
-                team_leader_email=email,
-                project_field=request.POST.get('project_field'),
-                project_category=request.POST.get('project_category'),
-                accept_terms=True
-            )
-            
-            print(f"✅ Registration created with ID: {registration.id}")
+            # Exact check: locks the team's quota rows until the team is counted
+            reserve_places(request.POST.get('project_field'), request.POST.get('project_category'))
             
-            # Create team members
-            members_created = 0
+            # Team members, inserted in a single INSERT after the registration
+            members = []
             for i in range(1, 6):
                 name = request.POST.get(f'member{i}_name', '').strip()
                 level = request.POST.get(f'member{i}_level')
                 
                 if name and level:
-                    member = TeamMember.objects.create(
+                    members.append(TeamMember(
                         name=name,
                         level=level,
                         order=i
-                    )
-                    registration.members.add(member)
-                    members_created += 1
-                    print(f"✅ Member {i} created: {name} ({level})")
+                    ))
+            
+            registration = Registration.create_team(
+                members,
+                team_leader_email=email,
+                project_field=request.POST.get('project_field'),
+                project_category=request.POST.get('project_category'),
+                accept_terms=True
+            )
+            members_created = len(members)
             
-            print(f"✅ Total members created: {members_created}")
+            # Committed together with the team; send_outbox delivers it
+            queue_confirmation(registration, members)
+            logger.info('Registration created', extra={
+                'registration_id': registration.id,
+                'members': members_created,
+                'project_field': registration.project_field,
+                'project_category': registration.project_category,
+            })
             
             # Return success page
             return HttpResponse(f"""
@@ -142,8 +189,14 @@ def handle_registration_submission(request):
             </html>
             """, content_type='text/html')
             
+    except QuotaFull as e:
+        return _rejected_response([str(e)])
+    except IntegrityError:
+        # The (season, email) constraint: registered by a concurrent
+        # submission after the availability check above
+        return _rejected_response(['This email is already registered in the system'])
     except Exception as e:
-        print(f"❌ Database error: {str(e)}")
+        logger.exception('Registration failed')
         return HttpResponse(f"""
         <html>
         <body style="font-family: Arial, sans-serif; text-align: center; padding: 50px;">
@@ -159,73 +212,250 @@ def registration_success(request):
     return render(request, 'registrations/success.html')
 
 @csrf_exempt
-@require_http_methods(["POST"])
+@require_http_methods(["GET", "POST"])
+@use_primary
 def validate_email(request):
-    """AJAX endpoint to validate email uniqueness"""
-    try:
-        data = json.loads(request.body)
-        email = data.get('email')
-        
-        if not email:
-            return JsonResponse({'valid': False, 'error': 'Email is required'})
-        
-        exists = Registration.objects.filter(team_leader_email=email).exists()
-        
-        return JsonResponse({
-            'valid': not exists,
-            'exists': exists,
-            'error': 'This email is already registered in the system' if exists else None
-        })
-    except json.JSONDecodeError:
-        return JsonResponse({'valid': False, 'error': 'Invalid request'}, status=400)
+    """AJAX endpoint to validate email uniqueness.
+    
+    The live check in script.js uses GET ?email=, whose answer may be reused
+    by the browser for settings.EMAIL_CHECK_MAX_AGE seconds; POST with a JSON
+    body is still accepted.
+    """
+    if request.method == 'GET':
+        email = request.GET.get('email', '').strip()
+    else:
+        try:
+            email = (json.loads(request.body).get('email') or '').strip()
+        except (json.JSONDecodeError, AttributeError):
+            return JsonResponse({'valid': False, 'error': 'Invalid request'}, status=400)
+    
+    if not email:
+        return JsonResponse({'valid': False, 'error': 'Email is required'})
+    
+    exists = Registration.email_exists(email)
+    
+    response = JsonResponse({
+        'valid': not exists,
+        'exists': exists,
+        'error': 'This email is already registered in the system' if exists else None
+    })
+    if request.method == 'GET':
+        patch_cache_control(response, private=True, max_age=settings.EMAIL_CHECK_MAX_AGE)
+    return response
 
+def _export_etag(request):
+    """ETag for an export: the registrations version plus the filters"""
+    return export_fingerprint(request.GET)
+
+@condition(etag_func=_export_etag)
 def export_csv(request):
-    """Export all registrations to CSV"""
+    """Export registrations matching the dashboard filters to CSV"""
     try:
-        registrations = Registration.objects.all().prefetch_related('members')
+        registrations = export_queryset(request.GET)
         
         import csv
         response = HttpResponse(content_type='text/csv')
         response['Content-Disposition'] = 'attachment; filename="registrations.csv"'
         
         writer = csv.writer(response)
-        writer.writerow(['Registration ID', 'Team Leader Email', 'Project Field', 'Project Category', 'Registration Date', 'Total Members', 'Member Names', 'Member Levels'])
-        
-        for reg in registrations:
-            member_names = ', '.join([member.name for member in reg.members.all().order_by('order')])
-            member_levels = ', '.join([member.level for member in reg.members.all().order_by('order')])
-            writer.writerow([
-                reg.id,
-                reg.team_leader_email,
-                reg.project_field,
-                reg.project_category,
-                reg.registration_date,
-                reg.members.count(),
-                member_names,
-                member_levels
-            ])
+        writer.writerow(EXPORT_HEADER)
+        writer.writerows(export_rows(registrations))
         
         return response
     except Exception as e:
         messages.error(request, f'Error exporting data: {str(e)}')
         return redirect('admin:index')
 
+def _export_job_data(job):
+    return {
+        'id': str(job.id),
+        'status': job.status,
+        'progress': job.progress,
+        'rows_written': job.rows_written,
+        'total_rows': job.total_rows,
+        'error': job.error or None,
+        'status_url': reverse('export_job_status', args=[job.id]),
+        'download_url': reverse('export_job_download', args=[job.id]) if job.status == ExportJob.STATUS_DONE else None,
+    }
+
+@require_http_methods(["POST"])
+def start_export_job(request):
+    """Start (or reuse) a background export of the filters in the query string"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    
+    job, created = get_or_start_export_job(request.GET, user=request.user)
+    return JsonResponse(_export_job_data(job), status=202 if created else 200)
+
+@use_primary
+def export_job_status(request, job_id):
+    """Polling endpoint reporting an export job's progress"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    
+    job = get_object_or_404(ExportJob, pk=job_id)
+    return JsonResponse(_export_job_data(job))
+
+@use_primary
+def export_job_download(request, job_id):
+    """Serve a finished export; FileResponse lets the server use sendfile"""
+    if not request.user.is_staff:
+        return redirect('admin:login')
+    
+    job = get_object_or_404(ExportJob, pk=job_id, status=ExportJob.STATUS_DONE)
+    path = spool_path(job)
+    if not path.exists():
+        raise Http404('Export file has expired')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename='registrations.csv', content_type='text/csv')
+
+def _events_authorized(request):
+    """Staff sessions, or downstream systems sending settings.EVENTS_API_TOKEN
+    as a bearer token"""
+    if request.user.is_staff:
+        return True
+    token = settings.EVENTS_API_TOKEN
+    header = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(header, f'Bearer {token}')
+
+@require_http_methods(["GET"])
+def registration_events(request):
+    """Change feed: events after ?cursor= (the last event id the consumer
+    applied), at most ?limit= of them. With ?wait=N and nothing new, the
+    request waits up to N seconds (capped at settings.EVENTS_MAX_WAIT) for
+    events before answering with an empty page."""
+    if not _events_authorized(request):
+        return JsonResponse({'error': 'Staff access or API token required'}, status=403)
+    
+    try:
+        cursor = int(request.GET.get('cursor', 0))
+        limit = int(request.GET.get('limit', EVENTS_PAGE_SIZE))
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        return JsonResponse({'error': 'cursor, limit and wait must be numbers'}, status=400)
+    if cursor < 0 or limit < 1 or wait < 0:
+        return JsonResponse({'error': 'cursor, limit and wait must not be negative'}, status=400)
+    
+    limit = min(limit, EVENTS_MAX_PAGE_SIZE)
+    # One extra row tells the consumer whether to ask again straight away
+    events = wait_for_events(cursor, limit + 1, min(wait, settings.EVENTS_MAX_WAIT))
+    has_more = len(events) > limit
+    events = events[:limit]
+    response = JsonResponse({
+        'events': [event.as_dict() for event in events],
+        'cursor': events[-1].pk if events else cursor,
+        'has_more': has_more,
+    })
+    patch_cache_control(response, no_store=True)
+    return response
+
+# Hours served by the hourly chart endpoint: two days by default, at most a
+# season's worth of campaign
+HOURLY_DEFAULT_HOURS = 48
+HOURLY_MAX_HOURS = 2160
+
+def hourly_registrations(request):
+    """Teams registered per hour over the last ?hours= hours, optionally for
+    one ?field= and/or ?category=, read from the hourly rollup"""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff access required'}, status=403)
+    
+    try:
+        hours = int(request.GET.get('hours', HOURLY_DEFAULT_HOURS))
+    except ValueError:
+        return JsonResponse({'error': 'hours must be a number'}, status=400)
+    if hours < 1:
+        return JsonResponse({'error': 'hours must be positive'}, status=400)
+    project_field = request.GET.get('field') or None
+    project_category = request.GET.get('category') or None
+    if project_field and project_field not in dict(Registration.PROJECT_FIELD_CHOICES):
+        return JsonResponse({'error': f'Unknown project field {project_field!r}'}, status=400)
+    if project_category and project_category not in dict(Registration.PROJECT_CATEGORY_CHOICES):
+        return JsonResponse({'error': f'Unknown project category {project_category!r}'}, status=400)
+    
+    hours = min(hours, HOURLY_MAX_HOURS)
+    now = timezone.now()
+    series = hourly_series(now - timedelta(hours=hours - 1), now, project_field, project_category)
+    response = JsonResponse({'hours': series, 'total': sum(entry['teams'] for entry in series)})
+    # The current hour keeps filling up; a chart polling once a minute is plenty
+    patch_cache_control(response, private=True, max_age=60)
+    return response
+
+def _filter_querystring(request):
+    """Current GET filters without the page number, for pagination links"""
+    params = request.GET.copy()
+    params.pop('page', None)
+    return params.urlencode()
+
 def admin_dashboard(request):
     """Simple admin dashboard to view registrations"""
     if not request.user.is_staff:
         return redirect('admin:login')
     
-    registrations = Registration.objects.all().prefetch_related('members')
+    filter_form = RegistrationFilterForm(request.GET)
+    search_query = request.GET.get('q', '').strip()
+    registrations = filter_form.filter(Registration.objects.all())
+    registrations = search_registrations(registrations, search_query)
+    registrations = registrations.prefetch_related('members')
+    
+    # Statistics for the filtered teams come from the in-memory snapshot
+    stats = snapshot_stats(**filter_form.as_filters())
     
-    # Pagination
-    paginator = Paginator(registrations, 10)
+    # Pagination; the paginator's count doubles as the total. Without a
+    # search the snapshot already has the exact total (it is checked against
+    # the table's validators on every call, so writes by other workers are
+    # seen); otherwise the database counts (or estimates, on large tables)
+    paginator = EstimatedCountPaginator(registrations, 10)
+    if not search_query:
+        paginator.count = stats['total_registrations']
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
     context = {
+        'stats': stats,
         'page_obj': page_obj,
         'registrations': page_obj,
-        'total_registrations': registrations.count(),
+        'total_registrations': paginator.count,
+        'total_is_estimate': paginator.count_is_estimate,
+        'search_query': search_query,
+        'filter_form': filter_form,
+        'filter_querystring': _filter_querystring(request),
     }
     
-    return render(request, 'registrations/admin_dashboard.html', context)
\ No newline at end of file
+    return render(request, 'registrations/admin_dashboard.html', context)
+
+def duplicate_members(request):
+    """Staff page listing students registered on more than one team of a
+    season (?season=, default the current one)"""
+    if not request.user.is_staff:
+        return redirect('admin:login')
+    
+    season = request.GET.get('season', '')
+    season = int(season) if season.isdigit() else current_season()
+    return render(request, 'registrations/duplicates.html', {
+        'groups': duplicate_report(limit=100, season=season),
+        'total_groups': duplicate_groups(season=season).count(),
+        'season': season,
+    })
+
+def profile_list(request):
+    """Staff page listing recent request profiles"""
+    if not request.user.is_staff:
+        return redirect('admin:login')
+    
+    return render(request, 'registrations/profiles.html', {'profiles': list_profiles()})
+
+def profile_detail(request, name):
+    """Text summary of a profile, or the raw pstats dump with ?download=1"""
+    if not request.user.is_staff:
+        return redirect('admin:login')
+    
+    if request.GET.get('download'):
+        path = profile_file(name, '.prof')
+        if path is None:
+            raise Http404('Profile not found')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{name}.prof')
+    
+    path = profile_file(name, '.txt')
+    if path is None:
+        raise Http404('Profile not found')
+    return HttpResponse(path.read_text(), content_type='text/plain; charset=utf-8')
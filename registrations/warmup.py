@@ -0,0 +1,74 @@
+"""
+Worker warm-up after a cold start.
+
+The first request a fresh worker serves otherwise pays for building the URL
+resolver, compiling templates, opening the database connection and filling
+the cached reads. warm_up() does that work up front; gunicorn.conf.py runs
+it in each worker once the application is loaded, before the worker accepts
+connections. Each step is timed and a failing step is logged and skipped, so
+warm-up can never keep a worker from starting.
+"""
+
+import logging
+import time
+
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+
+from .quotas import quota_usage
+
+logger = logging.getLogger(__name__)
+
+# Compiled once per worker by the cached template loader
+WARMUP_TEMPLATES = [
+    'registrations/index.html',
+    'registrations/success.html',
+    'registrations/emails/confirmation_subject.txt',
+    'registrations/emails/confirmation.txt',
+]
+
+
+def _urls():
+    # Reversing builds the reverse lookup tables; resolving imports every view
+    get_resolver().resolve(reverse('registration_index'))
+
+
+def _templates():
+    for name in WARMUP_TEMPLATES:
+        get_template(name)
+
+
+def _database():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def _caches():
+    quota_usage()
+
+
+WARMUP_STEPS = [
+    ('urls', _urls),
+    ('templates', _templates),
+    ('database', _database),
+    ('caches', _caches),
+]
+
+
+def warm_up():
+    """Run every warm-up step; returns [(step, seconds, error or None)]"""
+    timings = []
+    for step, prime in WARMUP_STEPS:
+        started = time.perf_counter()
+        error = None
+        try:
+            prime()
+        except Exception as e:
+            error = str(e)
+            logger.warning('Warm-up step failed', extra={'step': step, 'error': error})
+        timings.append((step, time.perf_counter() - started, error))
+    logger.info('Worker warmed up', extra={
+        'steps': {step: round(seconds * 1000, 1) for step, seconds, _ in timings},
+    })
+    return timings
@@ -1,18 +1,23 @@
 #!/bin/bash
 echo "Starting deployment setup..."
 
-# Install dependencies if not already installed
-echo "Installing dependencies..."
-pip install -r requirements.txt
+# Dependencies are installed by the platform's build step; FULL_BOOT=1
+# reinstalls them and recollects static files on every boot as before
+if [ "$FULL_BOOT" = "1" ]; then
+    echo "Installing dependencies..."
+    pip install -r requirements.txt
+fi
 
-# Run database migrations
-echo "Running database migrations..."
-python manage.py migrate --run-syncdb
+# Migrations run only when the database is behind the code
+echo "Checking database migrations..."
+python manage.py migrate_if_needed
 
-# Collect static files
-echo "Collecting static files..."
-python manage.py collectstatic --noinput
+# Static files are collected once per build, not once per boot
+if [ "$FULL_BOOT" = "1" ] || [ ! -d staticfiles ]; then
+    echo "Collecting static files..."
+    python manage.py collectstatic --noinput
+fi
 
 echo "Setup complete! Starting web server..."
-# Start Gunicorn
-gunicorn registration_system.wsgi --log-file -
\ No newline at end of file
+# Start Gunicorn; gunicorn.conf.py warms each worker up before it takes traffic
+exec gunicorn registration_system.wsgi --log-file -
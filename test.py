@@ -19,14 +19,6 @@ def test_models():
     try:
         from registrations.models import Registration, TeamMember
         
-        # اختبار إنشاء عضو
-        member = TeamMember.objects.create(
-            name="أحمد محمد",
-            level="bachelor",
-            order=1
-        )
-        print(f"✅ تم إنشاء عضو: {member.name}")
-        
         # اختبار إنشاء تسجيل
         registration = Registration.objects.create(
             team_leader_email="test@example.com",
@@ -35,8 +27,14 @@ def test_models():
             accept_terms=True
         )
         
-        # ربط العضو بالتسجيل
-        registration.members.add(member)
+        # اختبار إنشاء عضو مرتبط بالتسجيل
+        member = TeamMember.objects.create(
+            registration=registration,
+            name="أحمد محمد",
+            level="bachelor",
+            order=1
+        )
+        print(f"✅ تم إنشاء عضو: {member.name}")
         print(f"✅ تم إنشاء تسجيل: {registration.team_leader_email}")
         
         # اختبار عرض البيانات